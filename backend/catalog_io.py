@@ -0,0 +1,202 @@
+import csv
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models import Product
+
+PRODUCT_EXPORT_COLUMNS = [
+    "id", "name", "description", "price", "category", "images", "stock", "specifications",
+    "ratings_avg", "ratings_count", "created_at",
+]
+# Ratings belong to the reviews table and created_at to the first insert; an import never touches them
+UPSERT_COLUMNS = ["name", "description", "price", "category", "images", "stock", "specifications"]
+JSON_COLUMNS = {"images": list, "specifications": dict}
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    upserted: int = 0
+    failed: int = 0
+    # (line number, message) for the first ``max_errors`` bad rows
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield ``(line number, raw row)`` from a CSV or NDJSON stream without reading it all.
+
+    CSV cells hold ``images``/``specifications`` as JSON, the way the exporter
+    writes them. A line that cannot be decoded yields a RowError instead of a row.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            line = reader.line_num
+            try:
+                yield line, _from_csv(row)
+            except RowError as exc:
+                yield line, exc
+        return
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as exc:
+            yield line, RowError(f"invalid JSON: {exc}")
+            continue
+        yield line, row if isinstance(row, dict) else RowError("expected a JSON object")
+
+
+def _from_csv(row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    parsed: Dict[str, Any] = {}
+    for column, value in row.items():
+        if column is None:
+            raise RowError("more cells than header columns")
+        if column in JSON_COLUMNS:
+            if not value:
+                parsed[column] = JSON_COLUMNS[column]()
+                continue
+            try:
+                parsed[column] = json.loads(value)
+            except ValueError:
+                raise RowError(f"{column}: not valid JSON")
+        elif value != "" and value is not None:
+            parsed[column] = value
+    return parsed
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in exc.errors())
+
+
+def validate_row(raw: Dict[str, Any], schema: type) -> Dict[str, Any]:
+    """Check ``raw`` against ``schema`` (ProductCreate) and return the table values to upsert.
+
+    Rows without an ``id`` get a fresh one and are always inserted; rows with
+    an ``id`` update that product in place.
+    """
+    try:
+        product = schema.model_validate(raw)
+    except ValidationError as exc:
+        raise RowError(_validation_message(exc))
+    product_id = raw.get("id") or str(uuid.uuid4())
+    if not isinstance(product_id, str) or len(product_id) > 36:
+        raise RowError("id: must be a string of at most 36 characters")
+    values = product.model_dump()
+    return {"id": product_id, **{column: values[column] for column in UPSERT_COLUMNS}}
+
+
+def upsert_statement(dialect: str):
+    """INSERT that updates an existing product in place, for executemany over a batch.
+
+    A literal multi-row VALUES list cannot use SQLAlchemy's compiled cache and
+    took longer to compile than to run, so the row list goes in as parameters.
+    """
+    table = Product.__table__
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in UPSERT_COLUMNS})
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.id], set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS},
+        )
+    raise ValueError(f"No upsert support for {dialect}")
+
+
+async def import_products(
+    engine: AsyncEngine,
+    rows: Iterable[Tuple[int, Any]],
+    schema: type,
+    batch_size: int = 500,
+    max_errors: int = 100,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """Validate and upsert ``rows`` from ``read_rows``, one transaction per batch.
+
+    Bad rows are counted and skipped; the rest of their batch is still
+    written. A re-run with the same ids converges on the same catalog.
+    """
+    report = ImportReport()
+    statement = upsert_statement(engine.dialect.name)
+    now = datetime.now(timezone.utc)
+    # Keyed by id: a repeated id inside one batch keeps its last row, as a re-import would
+    batch: Dict[str, Dict[str, Any]] = {}
+
+    async def flush():
+        async with engine.begin() as conn:
+            await conn.execute(statement, [
+                {**values, "ratings_avg": 0.0, "ratings_count": 0, "created_at": now} for values in batch.values()
+            ])
+        report.upserted += len(batch)
+        batch.clear()
+        if progress:
+            progress(report)
+
+    for line, raw in rows:
+        report.rows += 1
+        try:
+            if isinstance(raw, RowError):
+                raise raw
+            values = validate_row(raw, schema)
+        except RowError as exc:
+            report.failed += 1
+            if len(report.errors) < max_errors:
+                report.errors.append((line, str(exc)))
+            continue
+        batch[values["id"]] = values
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return report
+
+
+SYNTHETIC_KINDS = ["Drill", "Oven", "Dishwasher", "Refrigerator", "Washer", "Cooktop", "Chimney Hood", "Vacuum", "Grinder", "Jigsaw"]
+SYNTHETIC_SERIES = ["Serie 2", "Serie 4", "Serie 6", "Serie 8", "GSB", "GWS", "Athlet", "Unlimited"]
+SYNTHETIC_CATEGORIES = ["ovens", "cooktops", "dishwashers", "refrigerators", "washing-machines", "vacuums", "power-tools"]
+
+
+def synthetic_products(count: int, seed: int = 1) -> Iterator[Dict[str, Any]]:
+    """Deterministic fake catalog rows for load testing; the same seed gives the same ids."""
+    rng = random.Random(seed)
+    for i in range(count):
+        kind = rng.choice(SYNTHETIC_KINDS)
+        series = rng.choice(SYNTHETIC_SERIES)
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "name": f"Bosch {series} {kind} {i:06d}",
+            "description": f"{series} {kind.lower()} with German engineering, built for everyday use.",
+            "price": round(rng.uniform(499, 149999), 2),
+            "category": rng.choice(SYNTHETIC_CATEGORIES),
+            "images": [f"https://cdn.example.com/products/{i}/{n}.jpg" for n in range(rng.randint(1, 4))],
+            "stock": rng.randint(0, 500),
+            "specifications": {
+                "Power": f"{rng.randint(300, 3600)}W",
+                "Warranty": f"{rng.randint(1, 5)} Years",
+                "Color": rng.choice(["Stainless Steel", "Black", "White", "Blue"]),
+            },
+        }
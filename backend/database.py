@@ -0,0 +1,116 @@
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Union
+
+from sqlalchemy import Delete, Insert, Update, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+def engine_options(url: Union[str, URL], prefix: str = "DB") -> Dict[str, Any]:
+    """Pool settings for ``url`` from ``<prefix>_POOL_SIZE`` and friends.
+
+    Connections are recycled before MySQL's idle timeout can close them, so
+    pre-ping (an extra round trip on every checkout) is off unless asked for.
+    """
+    env = lambda name, default: os.environ.get(f"{prefix}_{name}", default)  # noqa: E731
+    options: Dict[str, Any] = {
+        "echo": False,
+        "pool_pre_ping": env("POOL_PRE_PING", "false").lower() in ("1", "true", "yes"),
+    }
+    if make_url(url).get_backend_name() == "sqlite":
+        return options
+    options.update(
+        pool_size=int(env("POOL_SIZE", "10")),
+        max_overflow=int(env("MAX_OVERFLOW", "20")),
+        pool_timeout=float(env("POOL_TIMEOUT", "10")),
+        pool_recycle=int(env("POOL_RECYCLE", "280")),
+        pool_use_lifo=True,
+    )
+    return options
+
+
+class ReplicaRouter:
+    """Decides whether read-only sessions may use the replica right now.
+
+    A failed connect or a dropped connection on the replica takes it out of
+    rotation for ``retry_after`` seconds; reads go to the primary meanwhile.
+    ``RoutingSession`` retries the statement that hit the failure on the
+    primary, so callers do not see the outage.
+    """
+
+    def __init__(self, primary: AsyncEngine, replica: Optional[AsyncEngine], retry_after: float = 30.0):
+        self.primary = primary
+        self.replica = replica
+        self.retry_after = retry_after
+        self.down_until = 0.0
+        self.failures = 0
+        if replica is not None:
+            event.listen(replica.sync_engine, "handle_error", self._on_replica_error)
+
+    def _on_replica_error(self, context) -> None:
+        if context.connection is None or context.is_disconnect:
+            self.failures += 1
+            self.down_until = time.monotonic() + self.retry_after
+            logger.warning("Read replica unavailable (%s); using the primary for %.0fs", context.original_exception, self.retry_after)
+
+    def replica_available(self) -> bool:
+        return self.replica is not None and time.monotonic() >= self.down_until
+
+    def stats(self) -> Dict[str, Any]:
+        return {"configured": self.replica is not None, "available": self.replica_available(), "failures": self.failures}
+
+
+class RoutingSession(Session):
+    """Sends plain reads to the replica and anything that writes to the primary.
+
+    A read that fails because the replica is unreachable is retried once on
+    the primary. The dead replica connection has to be rolled back first, so
+    this only happens while the session has no writes or loaded objects that
+    a rollback would lose; later failures still raise.
+    """
+
+    router: ReplicaRouter
+    _used_primary = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)) or not self.router.replica_available():
+            self._used_primary = True
+            return self.router.primary.sync_engine
+        return self.router.replica.sync_engine
+
+    def _with_primary_fallback(self, method, *args, **kw):
+        failures = self.router.failures
+        try:
+            return method(*args, **kw)
+        except DBAPIError:
+            # The router's handle_error hook counts only replica connect failures and disconnects
+            if self.router.failures == failures or self._used_primary or self.identity_map or self.new or self.dirty or self.deleted:
+                raise
+            self.rollback()
+            return method(*args, **kw)
+
+    def execute(self, *args, **kw):
+        return self._with_primary_fallback(super().execute, *args, **kw)
+
+    def scalar(self, *args, **kw):
+        return self._with_primary_fallback(super().scalar, *args, **kw)
+
+    def scalars(self, *args, **kw):
+        return self._with_primary_fallback(super().scalars, *args, **kw)
+
+
+def read_sessionmaker(router: ReplicaRouter, **kw) -> async_sessionmaker:
+    if router.replica is None:
+        return async_sessionmaker(router.primary, class_=AsyncSession, **kw)
+    session_class = type("ReplicaRoutingSession", (RoutingSession,), {"router": router})
+    return async_sessionmaker(class_=AsyncSession, sync_session_class=session_class, **kw)
+
+
+def create_engine_from_env(url: Union[str, URL], prefix: str = "DB") -> AsyncEngine:
+    return create_async_engine(url, **engine_options(url, prefix))
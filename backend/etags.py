@@ -0,0 +1,100 @@
+import fcntl
+import mmap
+import os
+import secrets
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+# Header words of the counter table, followed by one counter per slot
+OWNER, EPOCH, GENERATION, HEADER = 0, 1, 2, 3
+
+
+class VersionClock:
+    """Version counters behind the ETags of the public catalog endpoints.
+
+    ``bump`` is driven by the invalidation bus, so every write that already
+    drops a cached product also moves the ETags that depend on it. With a
+    ``path`` the counters live in a memory-mapped file that every worker on
+    the host shares, so all of them hand out the same ETag for the same
+    data. Every worker bumps as it processes a key, so the final value is
+    only reached once all of them have dropped their cached copies.
+
+    Keys hash into a fixed number of slots; two keys sharing one only cost
+    an occasional needless 200. The file's epoch is redrawn whenever a new
+    server process group opens it, so ETags from before a restart never
+    match. A wall-clock window rolls every ETag over as often as cached
+    products expire, so edits made outside the bus cannot be answered with
+    304 for longer than the cache itself would serve them.
+    """
+
+    def __init__(self, path: Optional[str] = None, slots: int = 4096, window: float = 300.0, timer: Callable[[], float] = time.time):
+        self.window = window
+        self._timer = timer
+        self._slots = slots
+        self._fd: Optional[int] = None
+        if path is None:
+            self._counters = memoryview(bytearray(8 * (HEADER + slots))).cast("Q")
+            self._counters[EPOCH] = secrets.randbits(32)
+        else:
+            self._counters = self._open(Path(path))
+
+    def _open(self, path: Path) -> memoryview:
+        size = 8 * (HEADER + self._slots)
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            resized = os.fstat(self._fd).st_size != size
+            if resized:
+                os.ftruncate(self._fd, size)
+            counters = memoryview(mmap.mmap(self._fd, size)).cast("Q")
+            if resized or counters[OWNER] != os.getpgrp():
+                counters[HEADER:] = memoryview(bytes(8 * self._slots)).cast("Q")
+                counters[GENERATION] = 0
+                counters[EPOCH] = secrets.randbits(32)
+                counters[OWNER] = os.getpgrp()
+        return counters
+
+    @contextmanager
+    def _locked(self):
+        # Increments are read-modify-write across processes; a lost one could pair new data with an old ETag
+        if self._fd is None:
+            yield
+            return
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def _slot(self, key: str) -> int:
+        return HEADER + zlib.crc32(key.encode("utf-8")) % self._slots
+
+    @property
+    def generation(self) -> int:
+        return self._counters[GENERATION]
+
+    def bump(self, key: str) -> None:
+        with self._locked():
+            self._counters[self._slot(key)] += 1
+
+    def bump_all(self) -> None:
+        with self._locked():
+            self._counters[GENERATION] += 1
+
+    def etag(self, *keys: str) -> str:
+        window = int(self._timer() // self.window) if self.window > 0 else 0
+        parts = "-".join(str(self._counters[self._slot(key)]) for key in keys)
+        return f'"{self._counters[EPOCH]:08x}-{window}-{self._counters[GENERATION]}-{parts}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so a W/ prefix added by a proxy still matches
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Sequence
+
+import orjson
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+async def encode_rows(
+    rows: AsyncIterator[Dict[str, Any]],
+    fmt: str,
+    columns: Sequence[str],
+    chunk_rows: int = 500,
+) -> AsyncIterator[bytes]:
+    """Encode dict rows as NDJSON or CSV, yielding one bytes chunk per ``chunk_rows`` rows.
+
+    Only the current chunk is ever held in memory, so the export size is
+    bounded by the database cursor, not by RAM.
+    """
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        pending = 1
+        async for row in rows:
+            writer.writerow([_csv_value(row.get(column)) for column in columns])
+            pending += 1
+            if pending >= chunk_rows:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        if pending:
+            yield buffer.getvalue().encode("utf-8")
+        return
+
+    chunk = []
+    async for row in rows:
+        chunk.append(orjson.dumps(row))
+        if len(chunk) >= chunk_rows:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
@@ -0,0 +1,145 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_PRICE_EDGES = (0, 1000, 5000, 10000, 25000, 50000, 100000)
+DEFAULT_RATING_BANDS = (4, 3, 2, 1)
+
+
+class FacetIndex:
+    """Array-backed snapshot of the filterable product columns.
+
+    One row per product: category code, price and average rating, plus a
+    live flag so removals are O(1). Counts for a filter set are a handful of
+    vectorized comparisons and a ``bincount`` over the surviving rows.
+
+    Facets are disjunctive: each facet's counts apply every filter except
+    its own, so the storefront can show what picking another category or
+    price range would return.
+    """
+
+    def __init__(self, price_edges: Sequence[float] = DEFAULT_PRICE_EDGES, rating_bands: Sequence[float] = DEFAULT_RATING_BANDS, capacity: int = 1024):
+        self.price_edges = np.asarray(sorted(price_edges), dtype=np.float64)
+        self.rating_bands = tuple(sorted(rating_bands, reverse=True))
+        self._capacity = capacity
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def clear(self) -> None:
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._categories: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        self._category = np.zeros(self._capacity, dtype=np.int32)
+        self._price = np.zeros(self._capacity, dtype=np.float64)
+        self._rating = np.zeros(self._capacity, dtype=np.float64)
+        self._live = np.zeros(self._capacity, dtype=bool)
+
+    def replace(self, rows: Iterable[Tuple[str, str, float, float]]) -> None:
+        """Load ``(id, category, price, rating)`` rows in place of the current snapshot."""
+        self.clear()
+        for product_id, category, price, rating in rows:
+            self.add(product_id, category, price, rating)
+
+    def add(self, product_id: str, category: str, price: float, rating: float) -> None:
+        row = self._rows.get(product_id)
+        if row is None:
+            row = len(self._ids)
+            if row == len(self._live):
+                self._grow()
+            self._rows[product_id] = row
+            self._ids.append(product_id)
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self._categories)
+            self._categories.append(category)
+        self._category[row] = code
+        self._price[row] = price
+        self._rating[row] = rating or 0.0
+        self._live[row] = True
+
+    def remove(self, product_id: str) -> None:
+        row = self._rows.pop(product_id, None)
+        if row is None:
+            return
+        self._live[row] = False
+        self._ids[row] = None
+        # Dead rows still cost a slot in every comparison; compact once they dominate
+        if len(self._ids) > 1024 and len(self._rows) < len(self._ids) // 2:
+            self._compact()
+
+    def counts(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        product_ids: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """Facet counts for a filter set; ``product_ids`` restricts to search candidates."""
+        size = len(self._ids)
+        base = self._live[:size].copy()
+        if product_ids is not None:
+            allowed = np.zeros(size, dtype=bool)
+            rows = [self._rows[product_id] for product_id in product_ids if product_id in self._rows]
+            allowed[np.asarray(rows, dtype=np.intp)] = True
+            base &= allowed
+        codes, prices, ratings = self._category[:size], self._price[:size], self._rating[:size]
+
+        if category is None:
+            by_category = np.ones(size, dtype=bool)
+        elif category in self._category_codes:
+            by_category = codes == self._category_codes[category]
+        else:
+            by_category = np.zeros(size, dtype=bool)
+        by_price = np.ones(size, dtype=bool)
+        if min_price is not None:
+            by_price &= prices >= min_price
+        if max_price is not None:
+            by_price &= prices <= max_price
+        by_rating = ratings >= min_rating if min_rating is not None else np.ones(size, dtype=bool)
+
+        return {
+            "total": int(np.count_nonzero(base & by_category & by_price & by_rating)),
+            "categories": self._category_counts(codes[base & by_price & by_rating]),
+            "price": self._price_buckets(prices[base & by_category & by_rating]),
+            "rating": self._rating_bands(ratings[base & by_category & by_price]),
+        }
+
+    def _category_counts(self, codes: np.ndarray) -> List[Dict[str, Any]]:
+        counts = np.bincount(codes, minlength=len(self._categories))
+        order = sorted(np.flatnonzero(counts), key=lambda code: (-counts[code], self._categories[code]))
+        return [{"value": self._categories[code], "count": int(counts[code])} for code in order]
+
+    def _price_buckets(self, prices: np.ndarray) -> List[Dict[str, Any]]:
+        edges = self.price_edges
+        # Bucket i holds edges[i] <= price < edges[i + 1]; the last one is open-ended
+        buckets = np.maximum(np.searchsorted(edges, prices, side="right") - 1, 0)
+        counts = np.bincount(buckets, minlength=len(edges))
+        return [
+            {"min": float(low), "max": float(edges[i + 1]) if i + 1 < len(edges) else None, "count": int(counts[i])}
+            for i, low in enumerate(edges)
+        ]
+
+    def _rating_bands(self, ratings: np.ndarray) -> List[Dict[str, Any]]:
+        return [{"min_rating": float(band), "count": int(np.count_nonzero(ratings >= band))} for band in self.rating_bands]
+
+    def _grow(self) -> None:
+        capacity = max(self._capacity, 2 * len(self._live))
+        for name in ("_category", "_price", "_rating", "_live"):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self._live[:len(self._ids)])
+        for name in ("_category", "_price", "_rating", "_live"):
+            array = getattr(self, name)
+            compacted = np.zeros(max(self._capacity, len(keep)), dtype=array.dtype)
+            compacted[:len(keep)] = array[keep]
+            setattr(self, name, compacted)
+        self._ids = [self._ids[row] for row in keep]
+        self._rows = {product_id: row for row, product_id in enumerate(self._ids)}
@@ -0,0 +1,172 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from cache import TTLCache
+from models import IdempotencyRecord
+
+
+class IdempotencyMismatch(Exception):
+    pass
+
+
+class IdempotencyInProgress(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    scope: str
+    fingerprint: str
+    completed: bool
+    status_code: Optional[int] = None
+    body: Any = None
+
+
+def record_id(user_id: str, key: str) -> str:
+    return hashlib.sha256(f"{user_id}:{key}".encode("utf-8")).hexdigest()
+
+
+def fingerprint(scope: str, payload: Any) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{scope}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """Remembers the response to each ``Idempotency-Key`` for ``ttl`` seconds.
+
+    The first request for a key claims it by inserting a pending row; the
+    primary key makes that claim atomic across workers. Completed responses
+    are also kept in a per-worker LRU so most retries never reach the
+    database. The response is stored in the same transaction as the
+    request's own writes (see ``complete``), so a pending row older than
+    ``lock_timeout`` belongs to a request that died without committing and
+    may be claimed again.
+    """
+
+    def __init__(
+        self,
+        sessions: Callable,
+        ttl: float = 86400.0,
+        lock_timeout: float = 60.0,
+        cache_size: int = 10000,
+        cache_ttl: float = 600.0,
+    ):
+        self._sessions = sessions
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self._hot = TTLCache(maxsize=cache_size, ttl=min(cache_ttl, ttl))
+        self.replayed = 0
+
+    async def begin(self, user_id: str, key_id: str, scope: str, request_fingerprint: str) -> Optional[StoredResponse]:
+        """Claim ``key_id`` for a new request, or return the stored response to replay.
+
+        Raises ``IdempotencyMismatch`` if the key was used for a different
+        request and ``IdempotencyInProgress`` if the first one is still running.
+        """
+        stored = self._hot.get(key_id)
+        if stored is None:
+            stored = await self._claim(user_id, key_id, scope, request_fingerprint)
+            if stored is None:
+                return None
+            if stored.completed:
+                self._hot.set(key_id, stored)
+        if stored.scope != scope or stored.fingerprint != request_fingerprint:
+            raise IdempotencyMismatch("Idempotency-Key was already used for a different request")
+        if not stored.completed:
+            raise IdempotencyInProgress("A request with this Idempotency-Key is still being processed")
+        self.replayed += 1
+        return stored
+
+    async def _claim(self, user_id: str, key_id: str, scope: str, request_fingerprint: str) -> Optional[StoredResponse]:
+        now = datetime.now(timezone.utc)
+        async with self._sessions() as db:
+            await db.execute(
+                delete(IdempotencyRecord)
+                .where(
+                    IdempotencyRecord.id == key_id,
+                    or_(
+                        IdempotencyRecord.expires_at <= now,
+                        and_(
+                            IdempotencyRecord.status == "pending",
+                            IdempotencyRecord.created_at <= now - timedelta(seconds=self.lock_timeout),
+                        ),
+                    ),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.add(IdempotencyRecord(
+                id=key_id,
+                user_id=user_id,
+                scope=scope,
+                fingerprint=request_fingerprint,
+                status="pending",
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl),
+            ))
+            try:
+                await db.commit()
+                return None
+            except IntegrityError:
+                await db.rollback()
+            record = await db.get(IdempotencyRecord, key_id)
+        if record is None:
+            # The other request gave up between our insert and this read
+            return StoredResponse(scope, request_fingerprint, completed=False)
+        return StoredResponse(
+            record.scope,
+            record.fingerprint,
+            record.status == "completed",
+            record.response_status,
+            record.response_body,
+        )
+
+    async def complete(self, db, key_id: str, status_code: int, body: Any) -> None:
+        """Store the response for ``key_id`` inside the handler's own transaction.
+
+        The record only becomes completed if the handler's writes commit, and
+        it always does when they do, so a pending row never hides a committed
+        request from a later retry.
+        """
+        await db.execute(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.id == key_id, IdempotencyRecord.status == "pending")
+            .values(status="completed", response_status=status_code, response_body=body)
+            .execution_options(synchronize_session=False)
+        )
+
+    def remember(self, key_id: str, scope: str, request_fingerprint: str, status_code: int, body: Any) -> None:
+        self._hot.set(key_id, StoredResponse(scope, request_fingerprint, True, status_code, body))
+
+    async def abandon(self, key_id: str) -> None:
+        # Failed requests roll back everything they did, so the client may retry with the same key
+        async with self._sessions() as db:
+            await db.execute(
+                delete(IdempotencyRecord)
+                .where(IdempotencyRecord.id == key_id, IdempotencyRecord.status == "pending")
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    async def purge_expired(self, limit: int = 1000) -> int:
+        now = datetime.now(timezone.utc)
+        async with self._sessions() as db:
+            expired = (await db.execute(
+                select(IdempotencyRecord.id).where(IdempotencyRecord.expires_at <= now).limit(limit)
+            )).scalars().all()
+            if expired:
+                await db.execute(
+                    delete(IdempotencyRecord)
+                    .where(IdempotencyRecord.id.in_(expired))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        return len(expired)
+
+    def stats(self) -> dict:
+        return {"replayed": self.replayed, "cache": self._hot.stats()}
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Keys are short "<kind>:<id>" strings; keep each datagram well under the
+# default SO_SNDBUF so a single send never blocks or truncates.
+MAX_DATAGRAM = 4096
+
+
+class InvalidationBus:
+    """In-process invalidation channel, correct for a single worker.
+
+    Write paths call ``publish``; every subscribed handler runs locally and
+    ``_broadcast`` forwards the keys to the other workers. Cross-process
+    backends (Unix sockets here, Redis pub/sub later) only override
+    ``start``/``stop``/``_broadcast`` and feed received keys to ``_dispatch``.
+    """
+
+    def __init__(self):
+        self._handlers: List[Tuple[Callable[[str], None], bool]] = []
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, handler: Callable[[str], None], local: bool = True) -> None:
+        # local=False: only keys published by other workers, for state the
+        # publishing worker has already updated itself.
+        self._handlers.append((handler, local))
+
+    def publish(self, *keys: str) -> None:
+        for key in keys:
+            self._dispatch(key, remote=False)
+        self.published += len(keys)
+        self._broadcast(keys)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def _broadcast(self, keys: Iterable[str]) -> None:
+        pass
+
+    def _dispatch(self, key: str, remote: bool) -> None:
+        for handler, local in self._handlers:
+            if not (local or remote):
+                continue
+            try:
+                handler(key)
+            except Exception:
+                logger.exception("Invalidation handler failed for %s", key)
+
+
+class UnixSocketBus(InvalidationBus):
+    """Fans keys out to sibling workers through datagram sockets in a shared directory.
+
+    Each worker binds ``<socket_dir>/<pid>.sock``; publishing sends to every
+    other socket found there. Sockets left behind by dead workers are
+    unlinked the first time a send to them is refused.
+    """
+
+    def __init__(self, socket_dir: str):
+        super().__init__()
+        self.socket_dir = Path(socket_dir)
+        self._path: Optional[Path] = None
+        self._sock: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        self.socket_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self._path = self.socket_dir / f"{os.getpid()}.sock"
+        if self._path.exists():
+            self._path.unlink()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self._sock.bind(str(self._path))
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+
+    async def stop(self) -> None:
+        if self._sock is None:
+            return
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        if self._path is not None and self._path.exists():
+            self._path.unlink()
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                data = self._sock.recv(MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            for key in data.decode("utf-8").split("\n"):
+                if key:
+                    self.received += 1
+                    self._dispatch(key, remote=True)
+
+    def _broadcast(self, keys: Iterable[str]) -> None:
+        if self._sock is None:
+            return
+        datagrams = list(_pack(keys))
+        for peer in self.socket_dir.glob("*.sock"):
+            if peer == self._path:
+                continue
+            for datagram in datagrams:
+                try:
+                    self._sock.sendto(datagram, str(peer))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    peer.unlink(missing_ok=True)
+                    break
+                except BlockingIOError:
+                    # Peer's receive buffer is full; it is stuck, not gone.
+                    logger.warning("Invalidation dropped for busy worker socket %s", peer)
+                    break
+
+
+def _pack(keys: Iterable[str]):
+    batch: List[bytes] = []
+    size = 0
+    for key in keys:
+        encoded = key.encode("utf-8")
+        if batch and size + len(encoded) + 1 > MAX_DATAGRAM:
+            yield b"\n".join(batch)
+            batch, size = [], 0
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        yield b"\n".join(batch)
+
+
+def create_bus(backend: str, socket_dir: str) -> InvalidationBus:
+    if backend == "memory":
+        return InvalidationBus()
+    if backend == "local":
+        if not hasattr(socket, "AF_UNIX"):
+            logger.warning("Unix sockets unavailable; cache invalidation stays in-process")
+            return InvalidationBus()
+        return UnixSocketBus(socket_dir)
+    raise ValueError(f"Unknown INVALIDATION_BACKEND: {backend}")
@@ -0,0 +1,152 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Order, Product, StockReservation
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_ids: List[str]):
+        super().__init__(", ".join(product_ids))
+        self.product_ids = product_ids
+
+
+async def reserve_stock(db: AsyncSession, order_id: str, quantities: Dict[str, int], ttl: float) -> None:
+    """Take stock for every line of an order inside the caller's transaction.
+
+    Each line is one ``UPDATE ... SET stock = stock - n WHERE stock >= n``, so
+    the check and the decrement are a single atomic step and concurrent
+    checkouts can never drive stock below zero. Lines go in product-id order;
+    ``release_order`` restocks in the same order and the sweeper commits after
+    each order, so no transaction holds product rows out of that order. On
+    ``OutOfStock`` the caller must roll back; earlier lines were already taken.
+    """
+    short = []
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        result = await db.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.stock >= quantity)
+            .values(stock=Product.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            short.append(product_id)
+    if short:
+        raise OutOfStock(short)
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+    db.add_all(
+        StockReservation(
+            id=str(uuid.uuid4()),
+            order_id=order_id,
+            product_id=product_id,
+            quantity=quantity,
+            status="held",
+            expires_at=expires_at,
+        )
+        for product_id, quantity in quantities.items()
+    )
+
+
+async def lock_order(db: AsyncSession, order_id: str) -> None:
+    """Row-lock an order for the rest of the transaction.
+
+    Payment, admin cancellation and the sweeper all lock the order before
+    touching its reservations, so they serialize per order and always take
+    locks in the same order (order, then reservations, then products).
+    """
+    await db.execute(select(Order.id).where(Order.id == order_id).with_for_update())
+
+
+async def commit_reservations(db: AsyncSession, order_id: str) -> int:
+    """Mark an order's held stock as sold; returns how many holds were still held."""
+    result = await db.execute(
+        update(StockReservation)
+        .where(StockReservation.order_id == order_id, StockReservation.status == "held")
+        .values(status="committed")
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def holds_released(db: AsyncSession, order_id: str) -> bool:
+    """Whether the order's stock was handed back (expired or cancelled) rather than sold."""
+    result = await db.execute(
+        select(StockReservation.id)
+        .where(StockReservation.order_id == order_id, StockReservation.status == "released")
+        .limit(1)
+    )
+    return result.first() is not None
+
+
+async def release_order(db: AsyncSession, order_id: str) -> Set[str]:
+    """Return the stock an order still holds, inside the caller's transaction.
+
+    Claiming each reservation with a conditional ``held -> released`` update
+    means it is restocked exactly once. Products are restocked in product-id
+    order, the same order ``reserve_stock`` takes them in. Returns the product
+    ids restocked.
+    """
+    result = await db.execute(
+        select(StockReservation.id, StockReservation.product_id, StockReservation.quantity)
+        .where(StockReservation.order_id == order_id, StockReservation.status == "held")
+        .order_by(StockReservation.id)
+    )
+    restock: Dict[str, int] = {}
+    for reservation_id, product_id, quantity in result.all():
+        claimed = await db.execute(
+            update(StockReservation)
+            .where(StockReservation.id == reservation_id, StockReservation.status == "held")
+            .values(status="released")
+            .execution_options(synchronize_session=False)
+        )
+        if claimed.rowcount == 1:
+            restock[product_id] = restock.get(product_id, 0) + quantity
+    for product_id in sorted(restock):
+        await db.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(stock=Product.stock + restock[product_id])
+            .execution_options(synchronize_session=False)
+        )
+    return set(restock)
+
+
+async def release_expired(db: AsyncSession, limit: int = 500) -> Tuple[Set[str], Set[str]]:
+    """Return stock held by unpaid orders whose reservation window has passed.
+
+    Every worker runs the sweeper. Each order is locked before its holds are
+    released, so a payment for the same order either commits the holds first
+    (and the sweeper finds nothing to release) or sees them released. Each
+    order is its own transaction, so the sweeper never holds more than one
+    order's product rows and cannot deadlock against a checkout.
+    Returns the product ids restocked and the order ids cancelled.
+    """
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(StockReservation.order_id)
+        .where(StockReservation.status == "held", StockReservation.expires_at <= now)
+        .group_by(StockReservation.order_id)
+        .order_by(func.min(StockReservation.expires_at), StockReservation.order_id)
+        .limit(limit)
+    )
+    expired = result.scalars().all()
+    await db.commit()
+    products, orders = set(), set()
+    for order_id in expired:
+        await lock_order(db, order_id)
+        released = await release_order(db, order_id)
+        if released:
+            await db.execute(
+                update(Order)
+                .where(Order.id == order_id, Order.payment_status != "completed", Order.order_status == "pending")
+                .values(order_status="cancelled")
+                .execution_options(synchronize_session=False)
+            )
+            products |= released
+            orders.add(order_id)
+        await db.commit()
+    return products, orders
@@ -0,0 +1,256 @@
+import asyncio
+import bisect
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts, +Inf count, sum)
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        names = self.label_names + ("le",)
+        for labels, (counts, total, value_sum) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}"
+            yield f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {total}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(value_sum)}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {total}"
+
+
+class Gauge:
+    """Read through ``fn`` at scrape time; ``fn`` returns ``{label values: value}``."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Dict[Tuple[str, ...], float]], labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names, self._fn = name, help, tuple(labels), fn
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self._fn().items():
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], Dict[Tuple[str, ...], float]], labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, fn, labels))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                logger.exception("Failed to render metric %s", metric.name)
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    # (seconds, statement) for the slowest few queries, kept for the slow-request log
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+
+    def record(self, seconds: float, statement: str, keep: int = 3) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        if len(self.slowest) < keep or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, " ".join(statement.split())[:200]))
+            self.slowest.sort(reverse=True)
+            del self.slowest[keep:]
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def instrument_engines(engines: Dict[str, Any], registry: Registry) -> None:
+    """Count queries and DB time per engine and statement kind and attribute them to the current request."""
+    queries = registry.counter("db_queries_total", "SQL statements executed", ["db", "kind"])
+    seconds = registry.histogram("db_query_seconds", "SQL statement latency", ["db", "kind"])
+    for name, engine in engines.items():
+        _instrument(name, getattr(engine, "sync_engine", engine), queries, seconds)
+
+
+def _instrument(name: str, sync_engine, queries: Counter, seconds: Histogram) -> None:
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        queries.inc(name, kind)
+        seconds.observe(elapsed, name, kind)
+        stats = current_request.get()
+        if stats is not None:
+            stats.record(elapsed, statement)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def pool_gauges(engines: Dict[str, Any], registry: Registry) -> None:
+    def snapshot():
+        values = {}
+        for db, engine in engines.items():
+            # Looked up on every scrape: engine.dispose() swaps in a fresh pool
+            pool = getattr(engine, "sync_engine", engine).pool
+            for name in ("size", "checkedin", "checkedout", "overflow"):
+                method = getattr(pool, name, None)
+                if callable(method):
+                    values[(db, name)] = method()
+        return values
+
+    registry.gauge("db_pool_connections", "Connection pool state from engine.pool", snapshot, ["db", "state"])
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task; lag means something blocked it."""
+
+    def __init__(self, registry: Registry, interval: float = 0.5):
+        self.interval = interval
+        self.last = 0.0
+        self.peak = 0.0
+        self.histogram = registry.histogram(
+            "event_loop_lag_seconds", "Delay between a scheduled and an actual event loop wake-up",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+        )
+        registry.gauge("event_loop_lag_last_seconds", "Most recent event loop lag sample", lambda: {(): self.last})
+
+    async def run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last = max(0.0, time.perf_counter() - started - self.interval)
+            self.peak = max(self.peak, self.last)
+            self.histogram.observe(self.last)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template.
+
+    Requests slower than ``slow_seconds`` are logged with their query count,
+    DB time and slowest statements, which separates DB round trips from
+    time spent in Python (bcrypt, serialization) on the same request.
+    """
+
+    def __init__(self, app, registry: Registry, slow_seconds: float = 1.0):
+        self.app = app
+        self.slow_seconds = slow_seconds
+        self.latency = registry.histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"])
+        self.db_queries = registry.histogram(
+            "http_request_db_queries", "SQL statements per HTTP request", ["method", "route"], buckets=QUERY_COUNT_BUCKETS,
+        )
+        self.db_seconds = registry.histogram("http_request_db_seconds", "Time spent in SQL per HTTP request", ["method", "route"])
+        self.in_flight = 0
+        registry.gauge("http_requests_in_flight", "HTTP requests currently being handled", lambda: {(): self.in_flight})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight -= 1
+            current_request.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            self.latency.observe(elapsed, method, route, str(status["code"]))
+            self.db_queries.observe(stats.queries, method, route)
+            self.db_seconds.observe(stats.db_seconds, method, route)
+            if elapsed >= self.slow_seconds:
+                logger.warning(
+                    "Slow request %s %s -> %s in %.0f ms: %d queries, %.0f ms in DB; slowest: %s",
+                    method, route, status["code"], elapsed * 1000, stats.queries, stats.db_seconds * 1000,
+                    "; ".join(f"{seconds * 1000:.0f} ms {statement}" for seconds, statement in stats.slowest) or "none",
+                )
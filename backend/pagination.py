@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, literal, or_, select
+from sqlalchemy.sql.elements import ColumnElement
+
+# (column, descending) pairs; the last one must be unique (the primary key)
+# so every row has exactly one position in the ordering.
+SortKey = Sequence[Tuple[ColumnElement, bool]]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    plain = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(plain, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Malformed cursor")
+    return values
+
+
+def _coerce(column: ColumnElement, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        return python_type(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Malformed cursor")
+
+
+def _anchor(column: ColumnElement, value: Any, unique: ColumnElement, unique_value: Any) -> ColumnElement:
+    # The cursor row's stored value, falling back to the cursor's copy once that row is gone.
+    # A float does not survive the round trip: MySQL FLOAT reads back as 19.99 but stores
+    # 19.9899997, so comparing against the copy would skip or repeat the tied rows.
+    row = unique.table.alias("cursor_row")
+    stored = select(row.corresponding_column(column)).where(row.corresponding_column(unique) == unique_value)
+    return func.coalesce(stored.scalar_subquery(), literal(value, column.type))
+
+
+def keyset_filter(sort_key: SortKey, values: Sequence[Any]) -> ColumnElement:
+    # (a, b) after (x, y)  ==  a > x OR (a = x AND b > y), flipped per descending column.
+    # Spelled out rather than as a row-value comparison so MySQL can range-scan the index.
+    unique, unique_value = sort_key[-1][0], _coerce(sort_key[-1][0], values[-1])
+    bounds = [_coerce(column, value) for (column, _), value in zip(sort_key, values)]
+    bounds = [_anchor(column, bound, unique, unique_value) for (column, _), bound in zip(sort_key[:-1], bounds)] + [unique_value]
+    clauses = []
+    for i, (column, descending) in enumerate(sort_key):
+        equal_prefix = [col == bounds[j] for j, (col, _) in enumerate(sort_key[:i])]
+        step = column < bounds[i] if descending else column > bounds[i]
+        clauses.append(and_(*equal_prefix, step) if equal_prefix else step)
+    return or_(*clauses)
+
+
+def order_by(sort_key: SortKey) -> List[ColumnElement]:
+    return [column.desc() if descending else column.asc() for column, descending in sort_key]
+
+
+def paginate(query, sort_key: SortKey, cursor: Optional[str], limit: int):
+    """Apply ordering, the cursor position and a limit+1 probe to ``query``.
+
+    Pass the fetched rows to ``page_of`` to split off the extra row and build
+    the next cursor.
+    """
+    if cursor:
+        query = query.where(keyset_filter(sort_key, decode_cursor(cursor, len(sort_key))))
+    return query.order_by(*order_by(sort_key)).limit(limit + 1)
+
+
+def page_of(rows: Sequence[Any], sort_key: SortKey, limit: int) -> Tuple[List[Any], Optional[str]]:
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column, _ in sort_key])
@@ -0,0 +1,157 @@
+import abc
+import asyncio
+import hashlib
+import hmac
+import logging
+import random
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RAZORPAY_API = "https://api.razorpay.com/v1"
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+class PaymentGatewayError(Exception):
+    pass
+
+
+class PaymentGateway(abc.ABC):
+    """Async payment provider interface used by the payment routes.
+
+    Signature checks are a local HMAC over ``order_id|payment_id`` keyed with
+    the API secret, exactly as Razorpay signs checkout callbacks, so they never
+    leave the process.
+    """
+
+    def __init__(self, key_id: str, key_secret: str):
+        self.key_id = key_id
+        self._secret = key_secret.encode("utf-8")
+
+    @abc.abstractmethod
+    async def create_order(self, amount: int, currency: str = "INR", receipt: Optional[str] = None) -> Dict[str, Any]:
+        """Create a provider order for ``amount`` in the currency's smallest unit."""
+
+    def sign(self, order_id: str, payment_id: str) -> str:
+        return hmac.new(self._secret, f"{order_id}|{payment_id}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def verify_signature(self, order_id: str, payment_id: str, signature: str) -> bool:
+        return hmac.compare_digest(self.sign(order_id, payment_id), signature)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class RazorpayGateway(PaymentGateway):
+    def __init__(
+        self,
+        key_id: str,
+        key_secret: str,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_retries: int = 2,
+        backoff: float = 0.25,
+        max_connections: int = 20,
+        base_url: str = RAZORPAY_API,
+    ):
+        super().__init__(key_id, key_secret)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            auth=(key_id, key_secret),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def create_order(self, amount: int, currency: str = "INR", receipt: Optional[str] = None) -> Dict[str, Any]:
+        body = {"amount": amount, "currency": currency, "payment_capture": 1}
+        if receipt:
+            body["receipt"] = receipt
+        return await self._request("POST", "/orders", json=body)
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        # Creating an order is not idempotent, so only retry when the request
+        # provably never reached Razorpay or it explicitly asked us to back off.
+        attempt = 0
+        while True:
+            try:
+                response = await self._client.request(method, path, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                if attempt >= self.max_retries:
+                    raise PaymentGatewayError(f"Payment provider unreachable: {e}") from e
+            except httpx.HTTPError as e:
+                raise PaymentGatewayError(f"Payment provider request failed: {e}") from e
+            else:
+                if response.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    if response.is_error:
+                        raise PaymentGatewayError(_error_description(response))
+                    return response.json()
+            attempt += 1
+            delay = self.backoff * (2 ** (attempt - 1)) * (1 + random.random())
+            logger.warning("Retrying %s %s in %.2fs (attempt %d)", method, path, delay, attempt)
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class FakePaymentGateway(PaymentGateway):
+    """Offline stand-in for tests, load tests and local runs; never for production.
+
+    ``sign`` produces the same signature a real checkout would, so the
+    create -> pay -> verify flow can be driven end to end without Razorpay.
+    Orders live in memory and only the latest ``max_orders`` are kept.
+    """
+
+    def __init__(self, key_id: str, key_secret: str, latency: float = 0.0, max_orders: int = 10_000):
+        super().__init__(key_id, key_secret)
+        self.latency = latency
+        self.max_orders = max_orders
+        self.orders: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def create_order(self, amount: int, currency: str = "INR", receipt: Optional[str] = None) -> Dict[str, Any]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        order_id = f"order_fake{uuid.uuid4().hex[:14]}"
+        order = {
+            "id": order_id,
+            "entity": "order",
+            "amount": amount,
+            "amount_paid": 0,
+            "amount_due": amount,
+            "currency": currency,
+            "receipt": receipt,
+            "status": "created",
+            "attempts": 0,
+        }
+        self.orders[order_id] = order
+        while len(self.orders) > self.max_orders:
+            self.orders.popitem(last=False)
+        return order
+
+
+def _error_description(response: httpx.Response) -> str:
+    try:
+        return response.json()["error"]["description"]
+    except (ValueError, KeyError, TypeError):
+        return f"Payment provider returned HTTP {response.status_code}"
+
+
+def create_gateway(
+    backend: str,
+    key_id: str,
+    key_secret: str,
+    timeout: float = 10.0,
+    max_retries: int = 2,
+    fake_latency: float = 0.0,
+) -> PaymentGateway:
+    if backend == "razorpay":
+        return RazorpayGateway(key_id, key_secret, timeout=timeout, max_retries=max_retries)
+    if backend == "fake":
+        return FakePaymentGateway(key_id, key_secret, latency=fake_latency)
+    raise ValueError(f"Unknown PAYMENT_GATEWAY: {backend}")
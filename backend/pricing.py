@@ -0,0 +1,61 @@
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+# product_id -> (display name, unit price in paise)
+PriceBook = Mapping[str, Tuple[str, int]]
+
+
+def to_paise(amount: float) -> int:
+    # Go through the shortest decimal repr so 19.99 becomes 1999, not 1998.999...
+    return int(Decimal(repr(amount)).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_paise(paise: int) -> float:
+    return paise / 100
+
+
+@dataclass
+class QuoteLine:
+    product_id: str
+    product_name: str
+    unit_paise: int
+    quantity: int
+
+    @property
+    def total_paise(self) -> int:
+        return self.unit_paise * self.quantity
+
+
+@dataclass
+class Quote:
+    lines: List[QuoteLine] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+
+    @property
+    def total_paise(self) -> int:
+        return sum(line.total_paise for line in self.lines)
+
+    @property
+    def item_count(self) -> int:
+        return sum(line.quantity for line in self.lines)
+
+    def totals(self) -> Dict[str, float]:
+        return {"item_count": self.item_count, "subtotal": from_paise(self.total_paise), "total": from_paise(self.total_paise)}
+
+
+def quote(lines: Iterable[Tuple[str, int]], prices: PriceBook) -> Quote:
+    """Price ``(product_id, quantity)`` lines against server-side prices.
+
+    All arithmetic is integer paise; unknown products land in ``missing``
+    rather than raising so each caller decides whether that is an error.
+    """
+    result = Quote()
+    for product_id, quantity in lines:
+        entry = prices.get(product_id)
+        if entry is None:
+            result.missing.append(product_id)
+            continue
+        name, unit_paise = entry
+        result.lines.append(QuoteLine(product_id, name, unit_paise, quantity))
+    return result
@@ -0,0 +1,217 @@
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Field weights fold into term frequency (a simplified BM25F): a hit in the
+# product name counts for more than the same word buried in the description.
+DEFAULT_FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "specifications": 1.0, "description": 1.0}
+
+# Terms reached only through prefix expansion of the last query token rank
+# below an exact match of the same token.
+PREFIX_PENALTY = 0.8
+
+# Terms with at least this many postings get their arrays built with the index.
+WARM_POSTINGS = 256
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """In-memory inverted index with BM25 ranking and typeahead prefix matching.
+
+    Every query token must match (AND semantics, like the substring filter
+    it replaces); the last token also matches any indexed term it prefixes.
+
+    Documents are numbered rows (freed rows are reused) and each term's
+    postings are cached as ``(rows, tf)`` arrays, so scoring a query is a few
+    vectorized passes instead of a Python loop over every posting.
+    """
+
+    def __init__(self, field_weights: Optional[Dict[str, float]] = None, k1: float = 1.2, b: float = 0.75, capacity: int = 1024):
+        self.field_weights = field_weights or DEFAULT_FIELD_WEIGHTS
+        self.k1 = k1
+        self.b = b
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._lengths = np.zeros(capacity, dtype=np.float64)
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._total_len = 0.0
+        self._terms: List[str] = []
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, Dict[str, str]]], **options) -> "SearchIndex":
+        """Index ``(doc_id, fields)`` pairs into a new index.
+
+        Sorts the term list once at the end instead of inserting each new
+        term in place. Touches no shared state, so it can run on a worker
+        thread while the current index keeps serving.
+        """
+        index = cls(**options)
+        for doc_id, fields in documents:
+            index._index(doc_id, fields)
+        index._terms = sorted(index._postings)
+        # Warm the arrays of common terms here rather than on the first query that needs them
+        for term, postings in index._postings.items():
+            if len(postings) >= WARM_POSTINGS:
+                index._term_arrays(term)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    def clear(self) -> None:
+        self.swap(type(self)(self.field_weights, self.k1, self.b, len(self._lengths)))
+
+    def swap(self, fresh: "SearchIndex") -> None:
+        """Take over ``fresh``'s contents so existing references see the new index."""
+        self.__dict__.update(fresh.__dict__)
+
+    def add(self, doc_id: str, fields: Dict[str, str]) -> None:
+        self.remove(doc_id)
+        for term in self._index(doc_id, fields):
+            insort(self._terms, term)
+
+    def _index(self, doc_id: str, fields: Dict[str, str]) -> List[str]:
+        # Returns the terms this document introduced to the index
+        weighted: Dict[str, float] = {}
+        length = 0.0
+        for field, text in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            for term, count in Counter(tokenize(text or "")).items():
+                weighted[term] = weighted.get(term, 0.0) + weight * count
+                length += weight * count
+        if self._free:
+            row = self._free.pop()
+            self._ids[row] = doc_id
+        else:
+            row = len(self._ids)
+            if row == len(self._lengths):
+                grown = np.zeros(2 * len(self._lengths), dtype=np.float64)
+                grown[:row] = self._lengths
+                self._lengths = grown
+            self._ids.append(doc_id)
+        self._rows[doc_id] = row
+        self._lengths[row] = length
+        new_terms = []
+        for term, tf in weighted.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                new_terms.append(term)
+            postings[row] = tf
+            self._arrays.pop(term, None)
+        self._doc_terms[doc_id] = weighted
+        self._total_len += length
+        return new_terms
+
+    def remove(self, doc_id: str) -> None:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[row]
+            self._arrays.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+        self._total_len -= self._lengths[row]
+        self._lengths[row] = 0.0
+        self._ids[row] = None
+        self._free.append(row)
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        matches = []
+        for term in islice(self._terms, bisect_left(self._terms, prefix), None):
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None, prefix: bool = True) -> List[Tuple[str, float]]:
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._rows:
+            return []
+        # Each token is the set of (term, boost) alternatives that satisfy it
+        alternatives = []
+        for position, token in enumerate(tokens):
+            terms = [(token, 1.0)] if token in self._postings else []
+            if prefix and position == len(tokens) - 1:
+                terms += [(term, PREFIX_PENALTY) for term in self.expand_prefix(token) if term != token]
+            if not terms:
+                return []
+            alternatives.append(terms)
+        # Rarest token first, so every later token only scores the rows still in the running
+        alternatives.sort(key=lambda terms: sum(len(self._postings[term]) for term, _ in terms))
+        total: Optional[np.ndarray] = None
+        for terms in alternatives:
+            scores = self._score(terms, candidates=total)
+            total = scores if total is None else np.where(scores > 0, total + scores, 0.0)
+            if not total.any():
+                return []
+        return self._top(total, limit)
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = self._arrays[term] = (
+                np.fromiter(postings.keys(), dtype=np.intp, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings)),
+            )
+        return arrays
+
+    def _score(self, terms: List[Tuple[str, float]], candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """BM25 score of every row for one query token (0 where it does not match).
+
+        A row matching several of the token's terms keeps its best hit. With
+        ``candidates`` (the running total of earlier tokens) only rows that
+        are still candidates get scored.
+        """
+        n_docs = len(self._rows)
+        avg_len = self._total_len / n_docs
+        # norm(row) = k1 * (1 - b + b * length / avg_len), split into one multiply-add per posting
+        base, per_len = self.k1 * (1 - self.b), (self.k1 * self.b / avg_len if avg_len else 0.0)
+        scores = np.zeros(len(self._ids), dtype=np.float64)
+        for term, boost in terms:
+            rows, tfs = self._term_arrays(term)
+            if candidates is not None:
+                keep = candidates[rows] > 0
+                rows, tfs = rows[keep], tfs[keep]
+            idf = math.log(1 + (n_docs - len(self._postings[term]) + 0.5) / (len(self._postings[term]) + 0.5))
+            term_scores = boost * idf * (self.k1 + 1) * tfs / (tfs + base + per_len * self._lengths[rows])
+            # Rows are unique within one term, so a fancy-indexed max is safe here
+            scores[rows] = np.maximum(scores[rows], term_scores)
+        return scores
+
+    def _top(self, scores: np.ndarray, limit: Optional[int]) -> List[Tuple[str, float]]:
+        # Best score first, ties by id. A partition finds the cut-off score; rows tied on it
+        # (common when documents look alike) fill the remaining slots smallest id first
+        rows = np.flatnonzero(scores)
+        if limit is None or len(rows) <= limit:
+            ranked = list(zip((self._ids[row] for row in rows.tolist()), scores[rows].tolist()))
+        else:
+            values = scores[rows]
+            cutoff = float(np.partition(values, len(rows) - limit)[len(rows) - limit])
+            above = rows[values > cutoff]
+            tied = (self._ids[row] for row in rows[values == cutoff].tolist())
+            ranked = list(zip((self._ids[row] for row in above.tolist()), scores[above].tolist()))
+            ranked += [(doc_id, cutoff) for doc_id in heapq.nsmallest(limit - len(above), tied)]
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit is not None else ranked
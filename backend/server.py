@@ -1,25 +1,42 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import select, func
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy.types import String, Float, Integer, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, func, update, case, delete
 import os
 import logging
+import asyncio
 from pathlib import Path
-from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, ConfigDict, Field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
 import uuid
 import json
 from datetime import datetime, timezone, timedelta
 from passlib.context import CryptContext
 import jwt
-import razorpay
 from sqlalchemy.engine import URL
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.exc import IntegrityError
 import hashlib
+from database import ReplicaRouter, create_engine_from_env, read_sessionmaker
+from models import Base, User, Product, Cart, CartLine, Wishlist, WishlistItem, Review, Order, OrderLine
+from pricing import PriceBook, from_paise, quote, to_paise
+from inventory import OutOfStock, commit_reservations, holds_released, release_expired, release_order, reserve_stock
+from cache import TTLCache
+from singleflight import SingleFlight
+from invalidation import UnixSocketBus, create_bus
+from etags import VersionClock, etag_matches
+from exports import MEDIA_TYPES, encode_rows
+from catalog_io import PRODUCT_EXPORT_COLUMNS
+from metrics import LoopLagMonitor, MetricsMiddleware, Registry, instrument_engines, pool_gauges
+from search import SearchIndex
+from facets import DEFAULT_PRICE_EDGES, FacetIndex
+from payments import PaymentGatewayError, create_gateway
+from offload import BoundedExecutor, PoolSaturated
+from idempotency import IdempotencyInProgress, IdempotencyMismatch, IdempotencyStore, fingerprint, record_id
+from pagination import InvalidCursor, decode_cursor, encode_cursor, order_by, page_of, paginate
 
 ROOT_DIR = Path(__file__).parent
 if os.getenv("RENDER") is None:
@@ -27,7 +44,7 @@ if os.getenv("RENDER") is None:
 
 
 # ============= DATABASE SETUP =============
-database_url = URL.create(
+database_url = os.environ.get("DATABASE_URL") or URL.create(
     drivername="mysql+aiomysql",
     username="u434641461_bosch",
     password=os.getenv("DB_PASSWORD"),  # ← your real password from env
@@ -36,81 +53,25 @@ database_url = URL.create(
     database="u434641461_bosch_ecom",
     query={"charset": "utf8mb4"}        # Helps with emojis/special chars
 )
+# Optional read replica for the read-only catalog/order handlers; pool settings come from DB_* / DB_REPLICA_*
+replica_url = os.environ.get("DATABASE_REPLICA_URL")
 
-engine = create_async_engine(database_url, echo=False, pool_pre_ping=True)
+engine = create_engine_from_env(database_url)
+replica_engine = create_engine_from_env(replica_url, prefix="DB_REPLICA") if replica_url else None
+REPLICA_LAG_GRACE = float(os.environ.get("DB_REPLICA_LAG_GRACE", "2"))
+replica_router = ReplicaRouter(engine, replica_engine, retry_after=float(os.environ.get("DB_REPLICA_RETRY_AFTER", "30")))
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-
-class Base(DeclarativeBase):
-    pass
+read_session = read_sessionmaker(replica_router, expire_on_commit=False)
 
 async def get_db():
     async with async_session() as session:
         yield session
 
+async def get_read_db():
+    async with read_session() as session:
+        yield session
 
 
-# ============= DATABASE MODELS =============
-class User(Base):
-    __tablename__ = "users"
-    id: Mapped[str] = mapped_column(String(36), primary_key=True)
-    email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
-    password: Mapped[str] = mapped_column(String(255))
-    name: Mapped[str] = mapped_column(String(255))
-    phone: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
-    role: Mapped[str] = mapped_column(String(50), default="customer")
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
-
-class Product(Base):
-    __tablename__ = "products"
-    id: Mapped[str] = mapped_column(String(36), primary_key=True)
-    name: Mapped[str] = mapped_column(String(255), index=True)
-    description: Mapped[str] = mapped_column(String(2000))
-    price: Mapped[float] = mapped_column(Float, index=True)
-    category: Mapped[str] = mapped_column(String(100), index=True)
-    images: Mapped[str] = mapped_column(String(2000))
-    stock: Mapped[int] = mapped_column(Integer, default=0)
-    specifications: Mapped[str] = mapped_column(String(2000))
-    ratings_avg: Mapped[float] = mapped_column(Float, default=0.0)
-    ratings_count: Mapped[int] = mapped_column(Integer, default=0)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
-
-class Cart(Base):
-    __tablename__ = "carts"
-    id: Mapped[str] = mapped_column(String(36), primary_key=True)
-    user_id: Mapped[str] = mapped_column(String(36), index=True)
-    items: Mapped[str] = mapped_column(String(5000))
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
-
-class Wishlist(Base):
-    __tablename__ = "wishlists"
-    id: Mapped[str] = mapped_column(String(36), primary_key=True)
-    user_id: Mapped[str] = mapped_column(String(36), index=True, unique=True)
-    product_ids: Mapped[str] = mapped_column(String(5000))
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
-
-class Review(Base):
-    __tablename__ = "reviews"
-    id: Mapped[str] = mapped_column(String(36), primary_key=True)
-    product_id: Mapped[str] = mapped_column(String(36), index=True)
-    user_id: Mapped[str] = mapped_column(String(36), index=True)
-    user_name: Mapped[str] = mapped_column(String(255))
-    rating: Mapped[int] = mapped_column(Integer)
-    comment: Mapped[str] = mapped_column(String(1000))
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
-
-class Order(Base):
-    __tablename__ = "orders"
-    id: Mapped[str] = mapped_column(String(36), primary_key=True)
-    user_id: Mapped[str] = mapped_column(String(36), index=True)
-    items: Mapped[str] = mapped_column(String(5000))
-    total_amount: Mapped[float] = mapped_column(Float)
-    shipping_address: Mapped[str] = mapped_column(String(1000))
-    razorpay_order_id: Mapped[str] = mapped_column(String(100))
-    razorpay_payment_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
-    payment_status: Mapped[str] = mapped_column(String(50), default="pending")
-    order_status: Mapped[str] = mapped_column(String(50), default="pending")
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
 
 # ============= PYDANTIC MODELS =============
 class UserRegister(BaseModel):
@@ -132,6 +93,11 @@ class UserResponse(BaseModel):
     phone: Optional[str] = None
     created_at: datetime
 
+class TokenUser(BaseModel):
+    id: str
+    email: str
+    role: str = "customer"
+
 class ProductCreate(BaseModel):
     name: str
     description: str
@@ -161,9 +127,9 @@ def serialize_product(product: Product) -> ProductResponse:
         description=product.description,
         price=product.price,
         category=product.category,
-        images=json.loads(product.images),
+        images=product.images or [],
         stock=product.stock,
-        specifications=json.loads(product.specifications),
+        specifications=product.specifications or {},
         ratings_avg=product.ratings_avg,
         ratings_count=product.ratings_count,
         created_at=product.created_at.isoformat()
@@ -178,6 +144,43 @@ def serialize_user(user: User) -> UserResponse:
         phone=user.phone,
         created_at=user.created_at.isoformat()
     )
+
+# Plain-dict twins of the serializers above for hot list endpoints: same JSON, no model round trip
+def product_row(product: Product) -> dict:
+    return {
+        "id": product.id,
+        "name": product.name,
+        "description": product.description,
+        "price": product.price,
+        "category": product.category,
+        "images": product.images or [],
+        "stock": product.stock,
+        "specifications": product.specifications or {},
+        "ratings_avg": product.ratings_avg,
+        "ratings_count": product.ratings_count,
+        "created_at": product.created_at,
+    }
+
+def review_row(review: Review) -> dict:
+    return {
+        "id": review.id,
+        "product_id": review.product_id,
+        "user_id": review.user_id,
+        "user_name": review.user_name,
+        "rating": review.rating,
+        "comment": review.comment,
+        "created_at": review.created_at,
+    }
+
+def user_row(user: User) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "name": user.name,
+        "role": user.role,
+        "phone": user.phone,
+        "created_at": user.created_at,
+    }
 class CartItem(BaseModel):
     product_id: str
     quantity: int
@@ -185,6 +188,13 @@ class CartItem(BaseModel):
 class CartUpdate(BaseModel):
     items: List[CartItem]
 
+class CartLineChange(BaseModel):
+    product_id: str
+    quantity: int = Field(gt=0)
+
+class CartQuantity(BaseModel):
+    quantity: int = Field(gt=0)
+
 class ReviewCreate(BaseModel):
     product_id: str
     rating: int
@@ -206,8 +216,15 @@ class OrderItem(BaseModel):
     price: float
     quantity: int
 
+class OrderItemCreate(BaseModel):
+    product_id: str
+    quantity: int = Field(gt=0)
+    # What the client displayed; checked against current prices, never stored
+    product_name: Optional[str] = None
+    price: Optional[float] = None
+
 class OrderCreate(BaseModel):
-    items: List[OrderItem]
+    items: List[OrderItemCreate]
     total_amount: float
     shipping_address: dict
     razorpay_order_id: str
@@ -225,6 +242,47 @@ class OrderResponse(BaseModel):
     order_status: str = "pending"
     created_at: datetime
 
+class ProductPage(BaseModel):
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None
+
+class ProductBatchRequest(BaseModel):
+    ids: List[str]
+
+class ProductBatch(BaseModel):
+    items: List[ProductResponse]
+    missing: List[str]
+
+class CategoryFacet(BaseModel):
+    value: str
+    count: int
+
+class PriceFacet(BaseModel):
+    min: float
+    max: Optional[float] = None
+    count: int
+
+class RatingFacet(BaseModel):
+    min_rating: float
+    count: int
+
+class ProductFacets(BaseModel):
+    total: int
+    categories: List[CategoryFacet]
+    price: List[PriceFacet]
+    rating: List[RatingFacet]
+
+class FacetedProductPage(ProductPage):
+    facets: ProductFacets
+
+class OrderPage(BaseModel):
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
 class PaymentVerify(BaseModel):
     razorpay_order_id: str
     razorpay_payment_id: str
@@ -235,12 +293,163 @@ class PaymentOrderCreate(BaseModel):
 
 # ============= SETUP =============
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt costs 100-300 ms of CPU per call; keep it off the event loop and cap how much can pile up
+password_pool = BoundedExecutor(
+    "bcrypt",
+    max_workers=int(os.environ.get("PASSWORD_POOL_WORKERS", "2")),
+    max_queued=int(os.environ.get("PASSWORD_POOL_MAX_QUEUED", "64")),
+)
 security = HTTPBearer()
 JWT_SECRET = os.environ['JWT_SECRET']
 JWT_ALGORITHM = os.environ['JWT_ALGORITHM']
-razorpay_client = razorpay.Client(auth=(os.environ['RAZORPAY_KEY_ID'], os.environ['RAZORPAY_KEY_SECRET']))
+# "fake" keeps the whole checkout flow offline for load tests
+payment_gateway = create_gateway(
+    os.environ.get("PAYMENT_GATEWAY", "razorpay"),
+    os.environ['RAZORPAY_KEY_ID'],
+    os.environ['RAZORPAY_KEY_SECRET'],
+    timeout=float(os.environ.get("RAZORPAY_TIMEOUT", "10")),
+    max_retries=int(os.environ.get("RAZORPAY_MAX_RETRIES", "2")),
+    fake_latency=float(os.environ.get("FAKE_PAYMENT_LATENCY", "0")),
+)
+product_cache = TTLCache(
+    maxsize=int(os.environ.get("PRODUCT_CACHE_SIZE", "2048")),
+    ttl=float(os.environ.get("PRODUCT_CACHE_TTL", "300")),
+)
+# Authenticated users by id; short TTL bounds how long a change made outside the bus can linger
+user_cache = TTLCache(
+    maxsize=int(os.environ.get("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("USER_CACHE_TTL", "60")),
+)
+AUTH_TRUST_TOKEN_CLAIMS = os.environ.get("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
+# Dashboard snapshot shared by all admin requests on this worker; a few seconds stale is fine
+admin_stats_cache = TTLCache(maxsize=64, ttl=float(os.environ.get("ADMIN_STATS_TTL", "30")))
+# "local" fans invalidations out to every worker on this host; "memory" keeps them in-process
+invalidation_bus = create_bus(
+    os.environ.get("INVALIDATION_BACKEND", "local"),
+    os.environ.get("INVALIDATION_SOCKET_DIR", "/tmp/bosch-ecom-invalidation"),
+)
 
-app = FastAPI()
+# ETags for the public catalog endpoints; max-age lets browsers and a CDN reuse responses briefly
+# Shared by the workers on this host through the bus directory, so each one returns the same ETag
+catalog_versions = VersionClock(
+    path=str(invalidation_bus.socket_dir / "catalog-versions") if isinstance(invalidation_bus, UnixSocketBus) else None,
+    window=product_cache.ttl,
+)
+CATALOG_CACHE_CONTROL = f"public, max-age={int(os.environ.get('CATALOG_HTTP_MAX_AGE', '30'))}"
+
+# Concurrent identical catalog reads share one query; writes detach in-flight reads
+product_flights = SingleFlight()
+listing_flights = SingleFlight()
+
+def invalidate_catalog(key: str) -> bool:
+    kind, _, ident = key.partition(":")
+    if kind == "product":
+        product_cache.invalidate(ident)
+        product_flights.forget(ident)
+        listing_flights.clear()
+        catalog_versions.bump(key)
+        catalog_versions.bump("products")
+    elif kind == "catalog":
+        product_cache.clear()
+        product_flights.clear()
+        listing_flights.clear()
+        catalog_versions.bump_all()
+    elif kind == "reviews":
+        catalog_versions.bump(key)
+    else:
+        return False
+    return True
+
+def handle_invalidation(key: str) -> None:
+    if invalidate_catalog(key):
+        if replica_engine is not None:
+            # A lagging replica can still hand out the old rows for a moment after the write;
+            # drop whatever got cached (or ETagged) from them in the meantime
+            asyncio.get_running_loop().call_later(REPLICA_LAG_GRACE, invalidate_catalog, key)
+        return
+    kind, _, ident = key.partition(":")
+    if kind == "user":
+        # No route edits an existing user. Role changes and deletions made out of band (SQL, an
+        # ops script) must publish "user:<id>"; otherwise workers pick them up within USER_CACHE_TTL
+        user_cache.invalidate(ident)
+
+invalidation_bus.subscribe(handle_invalidation)
+
+# Full-text index over the catalog; rebuilt at startup, kept current by the product write routes
+search_index = SearchIndex()
+search_rebuild_lock = asyncio.Lock()
+# While a rebuild runs off the loop: product id -> latest search fields (None once deleted)
+search_rebuild_changes: Optional[Dict[str, Optional[Dict[str, str]]]] = None
+SEARCH_MAX_CANDIDATES = int(os.environ.get("SEARCH_MAX_CANDIDATES", "1000"))
+# Category / price / rating counts for the listing filters, kept alongside the search index
+FACET_PRICE_EDGES = [float(edge) for edge in os.environ.get("FACET_PRICE_EDGES", ",".join(map(str, DEFAULT_PRICE_EDGES))).split(",")]
+facet_index = FacetIndex(price_edges=FACET_PRICE_EDGES)
+facet_rebuild_lock = asyncio.Lock()
+# While a rebuild reads its snapshot: product id -> latest (category, price, rating) (None once deleted)
+facet_rebuild_changes: Optional[Dict[str, Optional[Tuple[str, float, float]]]] = None
+background_tasks = set()
+
+def spawn(coro) -> asyncio.Task:
+    task = asyncio.get_running_loop().create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def handle_remote_product_change(key: str) -> None:
+    kind, _, ident = key.partition(":")
+    if kind == "product":
+        spawn(refresh_search_document(ident))
+    elif kind == "search":
+        # Published after bulk catalog imports, where per-product keys would flood the bus
+        spawn(reindex_catalog())
+    elif kind == "catalog":
+        # Catalog-wide writes (imports, rating repairs) can touch any facet value
+        spawn(rebuild_facet_index())
+
+invalidation_bus.subscribe(handle_remote_product_change, local=False)
+
+# Responses to Idempotency-Key requests are kept this long for client retries
+idempotency_store = IdempotencyStore(
+    async_session,
+    ttl=float(os.environ.get("IDEMPOTENCY_TTL", "86400")),
+    lock_timeout=float(os.environ.get("IDEMPOTENCY_LOCK_TIMEOUT", "60")),
+    cache_size=int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", "10000")),
+)
+IDEMPOTENCY_SWEEP_INTERVAL = float(os.environ.get("IDEMPOTENCY_SWEEP_INTERVAL", "300"))
+
+# Stock taken at checkout is held this long for payment before the sweeper puts it back
+RESERVATION_TTL = float(os.environ.get("INVENTORY_RESERVATION_TTL", "900"))
+RESERVATION_SWEEP_INTERVAL = float(os.environ.get("INVENTORY_SWEEP_INTERVAL", "30"))
+
+# Keyset pagination: listings switch to {"items", "next_cursor"} pages when a
+# limit or cursor is passed, and keep returning a capped plain list otherwise.
+DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "200"))
+LEGACY_LIST_LIMIT = 1000
+# Upper bound on ids per /products/batch call: one IN (...) query and one response
+PRODUCT_BATCH_MAX_IDS = int(os.environ.get("PRODUCT_BATCH_MAX_IDS", "300"))
+PRODUCT_SORTS = {
+    "newest": ((Product.created_at, True), (Product.id, True)),
+    "oldest": ((Product.created_at, False), (Product.id, False)),
+    "price_asc": ((Product.price, False), (Product.id, False)),
+    "price_desc": ((Product.price, True), (Product.id, True)),
+    "rating": ((Product.ratings_avg, True), (Product.id, True)),
+}
+ORDER_SORT = ((Order.created_at, True), (Order.id, True))
+USER_SORT = ((User.created_at, True), (User.id, True))
+# Exports stream straight off a server-side cursor, this many rows per fetch and per chunk
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", "500"))
+ORDER_EXPORT_COLUMNS = [
+    "id", "user_id", "created_at", "payment_status", "order_status", "total_amount",
+    "razorpay_order_id", "razorpay_payment_id", "item_count", "items", "shipping_address",
+]
+USER_EXPORT_COLUMNS = ["id", "email", "name", "phone", "role", "created_at"]
+
+# Rows built by product_row/order_row/user_row are already response-shaped, so list
+# endpoints hand them straight to orjson instead of re-validating against response_model
+FAST_JSON_RESPONSES = os.environ.get("FAST_JSON_RESPONSES", "true").lower() in ("1", "true", "yes")
+
+app = FastAPI(default_response_class=ORJSONResponse if FAST_JSON_RESPONSES else JSONResponse)
 api_router = APIRouter(prefix="/api")
 
 # Add CORS middleware BEFORE router
@@ -251,13 +460,79 @@ app.add_middleware(
 allow_origins=[o.strip() for o in origins if o.strip()],
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "Idempotency-Key", "If-Match"],
+    expose_headers=["Idempotent-Replayed", "ETag"],
 )
+
+# Per-worker Prometheus metrics at /metrics; each gunicorn worker keeps its own numbers
+metrics_registry = Registry()
+database_engines = {"primary": engine, **({"replica": replica_engine} if replica_engine else {})}
+instrument_engines(database_engines, metrics_registry)
+pool_gauges(database_engines, metrics_registry)
+loop_lag = LoopLagMonitor(metrics_registry, interval=float(os.environ.get("LOOP_LAG_INTERVAL", "0.5")))
+metrics_registry.gauge(
+    "password_pool", "bcrypt thread pool state",
+    lambda: {(name,): value for name, value in password_pool.stats().items()}, ["stat"],
+)
+metrics_registry.gauge(
+    "cache_stat", "In-process cache counters",
+    lambda: {
+        (cache, name): value
+        for cache, stats in (("products", product_cache.stats()), ("users", user_cache.stats()), ("admin_stats", admin_stats_cache.stats()))
+        for name, value in stats.items()
+    },
+    ["cache", "stat"],
+)
+metrics_registry.gauge(
+    "singleflight", "Coalesced catalog reads",
+    lambda: {
+        (flight, name): value
+        for flight, stats in (("product", product_flights.stats()), ("listing", listing_flights.stats()))
+        for name, value in stats.items()
+    },
+    ["flight", "stat"],
+)
+metrics_registry.gauge(
+    "db_replica", "Read replica routing state",
+    lambda: {(name,): float(value) for name, value in replica_router.stats().items()}, ["stat"],
+)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+app.add_middleware(
+    MetricsMiddleware,
+    registry=metrics_registry,
+    slow_seconds=float(os.environ.get("SLOW_REQUEST_SECONDS", "1.0")),
+)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, please retry"}, headers={"Retry-After": "1"})
+
+@app.exception_handler(IdempotencyInProgress)
+async def idempotency_in_progress_handler(request: Request, exc: IdempotencyInProgress):
+    return JSONResponse(status_code=409, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(IdempotencyMismatch)
+async def idempotency_mismatch_handler(request: Request, exc: IdempotencyMismatch):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 def serialize_order(order: Order) -> OrderResponse:
     return OrderResponse(
         id=order.id,
         user_id=order.user_id,
-        items=json.loads(order.items),
+        items=[
+            OrderItem(product_id=line.product_id, product_name=line.product_name, price=line.price, quantity=line.quantity)
+            for line in order.lines
+        ],
         total_amount=order.total_amount,
         shipping_address=json.loads(order.shipping_address),
         razorpay_order_id=order.razorpay_order_id,
@@ -267,6 +542,39 @@ def serialize_order(order: Order) -> OrderResponse:
         created_at=order.created_at
     )
 
+def order_row(order: Order) -> dict:
+    return {
+        "id": order.id,
+        "user_id": order.user_id,
+        "items": [
+            {"product_id": line.product_id, "product_name": line.product_name, "price": line.price, "quantity": line.quantity}
+            for line in order.lines
+        ],
+        "total_amount": order.total_amount,
+        "shipping_address": json.loads(order.shipping_address),
+        "razorpay_order_id": order.razorpay_order_id,
+        "razorpay_payment_id": order.razorpay_payment_id,
+        "payment_status": order.payment_status,
+        "order_status": order.order_status,
+        "created_at": order.created_at,
+    }
+
+def fast_response(content: Any, headers: Optional[Dict[str, str]] = None):
+    if FAST_JSON_RESPONSES:
+        return ORJSONResponse(content, headers=headers)
+    if headers:
+        return JSONResponse(jsonable_encoder(content), headers=headers)
+    return content
+
+def conditional_get(request: Request, *keys: str):
+    # Checked before any query runs; the ETag is taken first so a write racing the
+    # query can only make the response newer than its ETag, never older
+    etag = catalog_versions.etag(*keys)
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers), headers
+    return None, headers
+
 # ============= UTILS =============
 def _prehash(password: str) -> str:
     # SHA-256 → fixed 32 bytes
@@ -283,24 +591,233 @@ def create_access_token(user_id: str, email: str, role: str) -> str:
     to_encode = {"sub": user_id, "email": email, "role": role, "exp": expire}
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
+async def load_products_by_ids(db: AsyncSession, product_ids: Iterable[str]) -> Dict[str, Product]:
+    # One IN (...) round trip for the whole request; callers keep their own ordering
+    unique_ids = list(dict.fromkeys(product_ids))
+    if not unique_ids:
+        return {}
+    result = await db.execute(select(Product).where(Product.id.in_(unique_ids)))
+    return {p.id: p for p in result.scalars().all()}
+
+def product_payload(product: Product, generation: Optional[int] = None) -> dict:
+    # Serialized ProductResponse dicts are what the cache holds; treat them as read-only
+    payload = product_row(product)
+    product_cache.set(product.id, payload, generation=generation)
+    return payload
+
+def cached_product_payload(product: Product, generation: Optional[int] = None) -> dict:
+    payload = product_cache.get(product.id)
+    if payload is None:
+        payload = product_payload(product, generation)
+    return payload
+
+async def load_product_payloads(db: AsyncSession, product_ids: Iterable[str]) -> Dict[str, dict]:
+    payloads = {}
+    missing = []
+    for product_id in dict.fromkeys(product_ids):
+        payload = product_cache.get(product_id)
+        if payload is None:
+            missing.append(product_id)
+        else:
+            payloads[product_id] = payload
+    if missing:
+        generation = product_cache.generation
+        for product_id, product in (await load_products_by_ids(db, missing)).items():
+            payloads[product_id] = product_payload(product, generation)
+    return payloads
+
+def search_fields(product: Product) -> Dict[str, str]:
+    specifications = product.specifications or {}
+    return {
+        "name": product.name,
+        "category": product.category,
+        "description": product.description,
+        "specifications": " ".join(f"{k} {v}" for k, v in specifications.items()),
+    }
+
+async def rebuild_search_index() -> None:
+    global search_rebuild_changes
+    columns = (Product.id, Product.name, Product.category, Product.description, Product.specifications)
+    async with search_rebuild_lock:
+        # Writes that land after the snapshot is read are replayed onto the new index before the swap
+        search_rebuild_changes = changes = {}
+        try:
+            documents = []
+            async with async_session() as db:
+                result = await db.stream(select(*columns).execution_options(yield_per=EXPORT_CHUNK_ROWS))
+                async for rows in result.partitions():
+                    documents.extend((row.id, search_fields(row)) for row in rows)
+            # Tokenizing a large catalog takes seconds; keep it off the event loop
+            fresh = await asyncio.to_thread(SearchIndex.build, documents)
+        finally:
+            search_rebuild_changes = None
+        for product_id, fields in changes.items():
+            if fields is None:
+                fresh.remove(product_id)
+            else:
+                fresh.add(product_id, fields)
+        search_index.swap(fresh)
+    logger.info("Search index built with %d products", len(search_index))
+
+async def rebuild_facet_index() -> None:
+    global facet_rebuild_changes
+    async with facet_rebuild_lock:
+        # Writes that land while the snapshot is read are replayed onto it, as for the search index
+        facet_rebuild_changes = changes = {}
+        try:
+            async with async_session() as db:
+                result = await db.execute(select(Product.id, Product.category, Product.price, Product.ratings_avg))
+                rows = result.all()
+        finally:
+            facet_rebuild_changes = None
+        facet_index.replace(rows)
+        for product_id, values in changes.items():
+            if values is None:
+                facet_index.remove(product_id)
+            else:
+                facet_index.add(product_id, *values)
+    catalog_versions.bump("products")
+
+def index_product(product: Product) -> None:
+    fields = search_fields(product)
+    search_index.add(product.id, fields)
+    if search_rebuild_changes is not None:
+        search_rebuild_changes[product.id] = fields
+    facet_index.add(product.id, product.category, product.price, product.ratings_avg)
+    if facet_rebuild_changes is not None:
+        facet_rebuild_changes[product.id] = (product.category, product.price, product.ratings_avg)
+
+def unindex_product(product_id: str) -> None:
+    search_index.remove(product_id)
+    if search_rebuild_changes is not None:
+        search_rebuild_changes[product_id] = None
+    facet_index.remove(product_id)
+    if facet_rebuild_changes is not None:
+        facet_rebuild_changes[product_id] = None
+
+async def refresh_search_document(product_id: str) -> None:
+    async with async_session() as db:
+        result = await db.execute(select(Product).where(Product.id == product_id))
+        product = result.scalar_one_or_none()
+    if product:
+        index_product(product)
+    else:
+        unindex_product(product_id)
+    # Search results changed after the bus already bumped the listing version
+    catalog_versions.bump("products")
+
+async def reindex_catalog() -> None:
+    await rebuild_search_index()
+    catalog_versions.bump("products")
+
+async def recompute_ratings(db: AsyncSession) -> int:
+    # Repair job: rebuild every product's aggregate from the reviews table in one statement
+    review_count = select(func.count(Review.id)).where(Review.product_id == Product.id).scalar_subquery()
+    review_avg = select(func.coalesce(func.avg(Review.rating), 0.0)).where(Review.product_id == Product.id).scalar_subquery()
+    result = await db.execute(update(Product).values(ratings_count=review_count, ratings_avg=review_avg))
+    await db.commit()
+    invalidation_bus.publish("catalog")
+    return result.rowcount
+
+def decode_token(credentials: HTTPAuthorizationCredentials) -> dict:
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
+        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+async def load_current_user(user_id: str, db: AsyncSession) -> UserResponse:
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    generation = user_cache.generation
+    result = await db.execute(select(User).where(User.id == user_id))
+    row = result.scalar_one_or_none()
+    if not row:
+        raise HTTPException(status_code=401, detail="User not found")
+    user = serialize_user(row)
+    user_cache.set(user_id, user, generation=generation)
+    return user
+
+def order_quantities(items) -> Dict[str, int]:
+    # One entry per product; repeated product ids add up, first occurrence keeps its place
+    quantities: Dict[str, int] = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+async def sweep_reservations() -> None:
+    while True:
+        await asyncio.sleep(RESERVATION_SWEEP_INTERVAL)
+        try:
+            async with async_session() as db:
+                products, orders = await release_expired(db)
+            if products:
+                invalidation_bus.publish(*(f"product:{product_id}" for product_id in products))
+                logger.info("Released expired stock reservations for %d orders", len(orders))
+        except Exception:
+            logger.exception("Stock reservation sweep failed")
+
+async def sweep_idempotency_keys() -> None:
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_SWEEP_INTERVAL)
+        try:
+            while await idempotency_store.purge_expired() > 0:
+                pass
+        except Exception:
+            logger.exception("Idempotency key sweep failed")
+
+async def run_idempotent(
+    key: Optional[str], user_id: str, scope: str, payload: Any, db: AsyncSession, handler: Callable[[], Awaitable[Any]],
+):
+    if key is None:
+        return await handler()
+    key_id = record_id(user_id, key)
+    request_fingerprint = fingerprint(scope, payload)
+    stored = await idempotency_store.begin(user_id, key_id, scope, request_fingerprint)
+    if stored is not None:
+        return JSONResponse(stored.body, status_code=stored.status_code, headers={"Idempotent-Replayed": "true"})
+    db.info["idempotency_key"] = key_id
+    try:
+        response = await handler()
+    except BaseException:
+        await idempotency_store.abandon(key_id)
+        raise
+    idempotency_store.remember(key_id, scope, request_fingerprint, 200, db.info["idempotency_body"])
+    return response
+
+async def commit_response(db: AsyncSession, response: Any) -> None:
+    """Commit a handler's writes together with the response stored for its Idempotency-Key."""
+    key_id = db.info.get("idempotency_key")
+    if key_id is not None:
+        body = db.info["idempotency_body"] = jsonable_encoder(response)
+        await idempotency_store.complete(db, key_id, 200, body)
+    await db.commit()
+
+def price_book(products: Iterable[Product]) -> PriceBook:
+    return {p.id: (p.name, to_paise(p.price)) for p in products}
 
-async def get_admin_user(user: User = Depends(get_current_user)):
+def payload_price_book(payloads: Dict[str, dict]) -> PriceBook:
+    return {product_id: (p["name"], to_paise(p["price"])) for product_id, p in payloads.items()}
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)) -> UserResponse:
+    payload = decode_token(credentials)
+    return await load_current_user(payload["sub"], db)
+
+async def get_token_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
+    # For read-only routes that only need the caller's id. With AUTH_TRUST_TOKEN_CLAIMS
+    # the signed claims are taken as-is: no lookup at all, at the price of a deleted or
+    # demoted user keeping read access until the token expires.
+    payload = decode_token(credentials)
+    if AUTH_TRUST_TOKEN_CLAIMS:
+        return TokenUser(id=payload["sub"], email=payload.get("email", ""), role=payload.get("role", "customer"))
+    return await load_current_user(payload["sub"], db)
+
+async def get_admin_user(user: UserResponse = Depends(get_current_user)):
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
@@ -312,12 +829,14 @@ async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     existing = result.scalar_one_or_none()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
+    # Hand the connection back while waiting on bcrypt; queued hashes would otherwise pin the whole DB pool
+    await db.close()
     
     user_id = str(uuid.uuid4())
     user = User(
         id=user_id,
         email=user_data.email,
-        password=hash_password(user_data.password),
+        password=await password_pool.run(hash_password, user_data.password),
         name=user_data.name,
         phone=user_data.phone,
         role="customer"
@@ -334,7 +853,8 @@ async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
 async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == credentials.email))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(credentials.password, user.password):
+    await db.close()
+    if not user or not await password_pool.run(verify_password, credentials.password, user.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     token = create_access_token(user.id, user.email, user.role)
@@ -342,48 +862,181 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
 
 
 @api_router.get("/auth/me", response_model=UserResponse)
-async def get_me(user: User = Depends(get_current_user)):
+async def get_me(user: UserResponse = Depends(get_current_user)):
     return serialize_user(user)
 
 
 # ============= PRODUCT ROUTES =============
-@api_router.get("/products", response_model=List[ProductResponse])
+def product_facets(
+    category: Optional[str],
+    search: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    min_rating: Optional[float],
+    candidates: Optional[List[str]] = None,
+) -> dict:
+    # Same candidate set the listing uses, so facet totals agree with the results
+    if search and candidates is None:
+        candidates = [product_id for product_id, _ in search_index.search(search, limit=SEARCH_MAX_CANDIDATES)]
+    return facet_index.counts(category or None, min_price, max_price, min_rating, product_ids=candidates)
+
+@api_router.get("/products", response_model=Union[FacetedProductPage, ProductPage, List[ProductResponse]])
 async def get_products(
+    request: Request,
     category: Optional[str] = None,
     search: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     min_rating: Optional[float] = None,
-    db: AsyncSession = Depends(get_db)
+    sort: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    facets: bool = False,
 ):
+    if sort is not None and sort not in PRODUCT_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(PRODUCT_SORTS)}")
+    if facets and limit is None and cursor is None:
+        raise HTTPException(status_code=400, detail="facets requires limit or cursor")
+    not_modified, headers = conditional_get(request, "products")
+    if not_modified:
+        return not_modified
+    # Search terms are matched case-insensitively, so "Oven" and "oven" share one query
+    params = (category, search.lower() if search else search, min_price, max_price, min_rating, sort, limit, cursor, facets)
+
+    async def load():
+        async with read_session() as db:
+            return await list_products(db, *params)
+
+    return fast_response(await listing_flights.run(params, load), headers)
+
+async def list_products(
+    db: AsyncSession,
+    category: Optional[str],
+    search: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    min_rating: Optional[float],
+    sort: Optional[str],
+    limit: Optional[int],
+    cursor: Optional[str],
+    facets: bool,
+) -> Union[dict, list]:
+    paged = limit is not None or cursor is not None
+    page_size = limit or DEFAULT_PAGE_SIZE
+
+    def page(items: list, next_cursor: Optional[str]) -> dict:
+        body = {"items": items, "next_cursor": next_cursor}
+        if facets:
+            body["facets"] = product_facets(category, search, min_price, max_price, min_rating, ranked_ids)
+        return body
+
     query = select(Product)
+    rank = None
+    ranked_ids: Optional[List[str]] = None
+    if search:
+        ranked_ids = [product_id for product_id, _ in search_index.search(search, limit=SEARCH_MAX_CANDIDATES)]
+        if not ranked_ids:
+            return page([], None) if paged else []
+        rank = {product_id: position for position, product_id in enumerate(ranked_ids)}
+        query = query.where(Product.id.in_(ranked_ids))
     if category:
         query = query.where(Product.category == category)
-    if search:
-        query = query.where(Product.name.ilike(f"%{search}%"))
     if min_price is not None:
         query = query.where(Product.price >= min_price)
     if max_price is not None:
         query = query.where(Product.price <= max_price)
     if min_rating is not None:
         query = query.where(Product.ratings_avg >= min_rating)
-    
-    result = await db.execute(query.limit(1000))
+
+    if rank is not None and sort is None and paged:
+        # Relevance order lives in the index, so page by rank position over the
+        # (bounded) candidate set and only load full rows for the page itself
+        after = decode_cursor(cursor, 1)[0] if cursor else -1
+        if not isinstance(after, int):
+            raise InvalidCursor("Malformed cursor")
+        result = await db.execute(query.with_only_columns(Product.id))
+        positions = sorted(p for p in (rank[product_id] for product_id in result.scalars()) if p > after)
+        next_cursor = encode_cursor([positions[page_size - 1]]) if len(positions) > page_size else None
+        page_ids = [ranked_ids[p] for p in positions[:page_size]]
+        payloads = await load_product_payloads(db, page_ids)
+        return page([payloads[i] for i in page_ids if i in payloads], next_cursor)
+
+    generation = product_cache.generation
+    if paged:
+        sort_key = PRODUCT_SORTS[sort or "newest"]
+        result = await db.execute(paginate(query, sort_key, cursor, page_size))
+        products, next_cursor = page_of(result.scalars().all(), sort_key, page_size)
+        return page([cached_product_payload(p, generation) for p in products], next_cursor)
+
+    if sort is not None:
+        query = query.order_by(*order_by(PRODUCT_SORTS[sort]))
+    result = await db.execute(query.limit(LEGACY_LIST_LIMIT))
     products = result.scalars().all()
-    return [serialize_product(p) for p in products]
+    if rank is not None and sort is None:
+        products = sorted(products, key=lambda p: rank[p.id])
+    return [cached_product_payload(p, generation) for p in products]
 
 
+@api_router.get("/products/facets", response_model=ProductFacets)
+async def get_product_facets(
+    request: Request,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_rating: Optional[float] = None,
+):
+    not_modified, headers = conditional_get(request, "products")
+    if not_modified:
+        return not_modified
+    return fast_response(product_facets(category, search, min_price, max_price, min_rating), headers)
+
+
+async def product_batch(db: AsyncSession, product_ids: List[str]) -> dict:
+    # Cached payloads first, the rest in one IN (...) query; input order, duplicates dropped
+    product_ids = list(dict.fromkeys(product_id for product_id in product_ids if product_id))
+    if len(product_ids) > PRODUCT_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {PRODUCT_BATCH_MAX_IDS} ids per request")
+    payloads = await load_product_payloads(db, product_ids)
+    return {
+        "items": [payloads[product_id] for product_id in product_ids if product_id in payloads],
+        "missing": [product_id for product_id in product_ids if product_id not in payloads],
+    }
+
+# Declared before /products/{product_id} so "batch" is not taken for an id
+@api_router.get("/products/batch", response_model=ProductBatch)
+async def get_product_batch(ids: str = Query(..., description="Comma-separated product ids"), db: AsyncSession = Depends(get_read_db)):
+    return fast_response(await product_batch(db, [product_id.strip() for product_id in ids.split(",")]))
+
+@api_router.post("/products/batch", response_model=ProductBatch)
+async def post_product_batch(batch: ProductBatchRequest, db: AsyncSession = Depends(get_read_db)):
+    # Same lookup for id lists too long for a query string
+    return fast_response(await product_batch(db, batch.ids))
+
+
+async def fetch_product_payload(product_id: str) -> Optional[dict]:
+    generation = product_cache.generation
+    async with read_session() as db:
+        result = await db.execute(select(Product).where(Product.id == product_id))
+        product = result.scalar_one_or_none()
+    return product_payload(product, generation) if product else None
+
 @api_router.get("/products/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Product).where(Product.id == product_id))
-    product = result.scalar_one_or_none()
-    if not product:
+async def get_product(product_id: str, request: Request):
+    not_modified, headers = conditional_get(request, f"product:{product_id}")
+    if not_modified:
+        return not_modified
+    payload = product_cache.get(product_id)
+    if payload is None:
+        # A cache miss on a hot product: concurrent requests share one query
+        payload = await product_flights.run(product_id, lambda: fetch_product_payload(product_id))
+    if payload is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return serialize_product(product)
+    return fast_response(payload, headers)
 
 
 @api_router.post("/products", response_model=ProductResponse)
-async def create_product(product_data: ProductCreate, admin: User = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
+async def create_product(product_data: ProductCreate, admin: UserResponse = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
     product_id = str(uuid.uuid4())
     product = Product(
         id=product_id,
@@ -391,18 +1044,20 @@ async def create_product(product_data: ProductCreate, admin: User = Depends(get_
         description=product_data.description,
         price=product_data.price,
         category=product_data.category,
-        images=json.dumps(product_data.images),
+        images=product_data.images,
         stock=product_data.stock,
-        specifications=json.dumps(product_data.specifications)
+        specifications=product_data.specifications
     )
     db.add(product)
     await db.commit()
     await db.refresh(product)
-    return serialize_product(product)
+    index_product(product)
+    invalidation_bus.publish(f"product:{product_id}")
+    return product_payload(product)
 
 
 @api_router.put("/products/{product_id}", response_model=ProductResponse)
-async def update_product(product_id: str, product_data: ProductCreate, admin: User = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
+async def update_product(product_id: str, product_data: ProductCreate, admin: UserResponse = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Product).where(Product.id == product_id))
     product = result.scalar_one_or_none()
     if not product:
@@ -412,123 +1067,268 @@ async def update_product(product_id: str, product_data: ProductCreate, admin: Us
     product.description = product_data.description
     product.price = product_data.price
     product.category = product_data.category
-    product.images = json.dumps(product_data.images)
+    product.images = product_data.images
     product.stock = product_data.stock
-    product.specifications = json.dumps(product_data.specifications)
+    product.specifications = product_data.specifications
     
     await db.commit()
     await db.refresh(product)
-    return serialize_product(product)
+    index_product(product)
+    invalidation_bus.publish(f"product:{product_id}")
+    return product_payload(product)
 
 @api_router.delete("/products/{product_id}")
-async def delete_product(product_id: str, admin: User = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
+async def delete_product(product_id: str, admin: UserResponse = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Product).where(Product.id == product_id))
     product = result.scalar_one_or_none()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     await db.delete(product)
     await db.commit()
+    unindex_product(product_id)
+    invalidation_bus.publish(f"product:{product_id}")
     return {"message": "Product deleted"}
 
 # ============= CART ROUTES =============
 @api_router.get("/cart")
-async def get_cart(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Cart).where(Cart.user_id == user.id))
-    cart = result.scalar_one_or_none()
-    if not cart:
-        return {"items": []}
-    
-    items = json.loads(cart.items) if cart.items else []
-    items_with_details = []
-    for item in items:
-        result = await db.execute(select(Product).where(Product.id == item["product_id"]))
-        product = result.scalar_one_or_none()
-        if product:
-            items_with_details.append({**item, "product": serialize_product(product).model_dump()})
+async def get_cart(user: TokenUser = Depends(get_token_user), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(Cart.version, CartLine.product_id, CartLine.quantity)
+        .outerjoin(CartLine, CartLine.cart_id == Cart.id)
+        .where(Cart.user_id == user.id)
+        .order_by(CartLine.position)
+    )
+    rows = result.all()
+    version = rows[0].version if rows else 0
+    items = [{"product_id": row.product_id, "quantity": row.quantity} for row in rows if row.product_id is not None]
+    products = await load_product_payloads(db, (item["product_id"] for item in items))
+    items_with_details = [
+        {**item, "product": products[item["product_id"]]}
+        for item in items
+        if item["product_id"] in products
+    ]
+    totals = quote(((item["product_id"], item["quantity"]) for item in items), payload_price_book(products)).totals()
     
-    return {"items": items_with_details}
+    return {"items": items_with_details, "totals": totals, "version": version}
 
-@api_router.post("/cart")
-async def update_cart(cart_data: CartUpdate, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Cart).where(Cart.user_id == user.id))
-    cart = result.scalar_one_or_none()
-    
-    items_json = json.dumps([item.model_dump() for item in cart_data.items])
-    
-    if cart:
-        cart.items = items_json
-        cart.updated_at = datetime.now(timezone.utc)
-    else:
-        cart = Cart(
-            id=str(uuid.uuid4()),
-            user_id=user.id,
-            items=items_json
+def expected_cart_version(if_match: Optional[str]) -> Optional[int]:
+    if if_match is None:
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be the cart version")
+
+async def lock_cart(db: AsyncSession, user_id: str, expected_version: Optional[int]) -> Tuple[str, int]:
+    """Bump the user's cart version and return ``(cart id, new version)``.
+
+    Runs first in every cart write: the UPDATE holds the cart row lock until
+    commit, so concurrent writes to one cart apply one after the other. With
+    ``expected_version`` a write based on a stale cart gets a 409 instead.
+    """
+    cart_id = await db.scalar(select(Cart.id).where(Cart.user_id == user_id))
+    if cart_id is None:
+        db.add(Cart(id=str(uuid.uuid4()), user_id=user_id, version=0))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another request created it first (carts.user_id is unique)
+            await db.rollback()
+    stmt = update(Cart).where(Cart.user_id == user_id).values(version=Cart.version + 1, updated_at=datetime.now(timezone.utc))
+    if expected_version is not None:
+        stmt = stmt.where(Cart.version == expected_version)
+    result = await db.execute(stmt)
+    cart = (await db.execute(select(Cart.id, Cart.version).where(Cart.user_id == user_id))).one()
+    if result.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail={"message": "Cart was changed by another request", "version": cart.version})
+    return cart.id, cart.version
+
+async def cart_totals(db: AsyncSession, cart_id: str) -> Tuple[Dict[str, int], Dict[str, dict], dict]:
+    # Quantities only (two narrow columns); product rows come from the cache where possible
+    result = await db.execute(select(CartLine.product_id, CartLine.quantity).where(CartLine.cart_id == cart_id))
+    quantities = dict(result.all())
+    products = await load_product_payloads(db, quantities)
+    return quantities, products, quote(quantities.items(), payload_price_book(products)).totals()
+
+async def cart_change(db: AsyncSession, cart_id: str, version: int, product_ids: Iterable[str]) -> dict:
+    quantities, products, totals = await cart_totals(db, cart_id)
+    lines = [
+        {"product_id": product_id, "quantity": quantities.get(product_id, 0), "product": products.get(product_id)}
+        for product_id in product_ids
+    ]
+    return {"version": version, "lines": lines, "totals": totals}
+
+async def require_products(db: AsyncSession, product_ids: Iterable[str]) -> None:
+    found = await load_product_payloads(db, product_ids)
+    missing = [product_id for product_id in product_ids if product_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Unknown products", "product_ids": missing})
+
+async def add_cart_quantities(db: AsyncSession, cart_id: str, quantities: Dict[str, int], replace: bool = False) -> None:
+    # UPDATE the lines that exist; only new products insert, appended after the current last line
+    existing = set((await db.execute(
+        select(CartLine.product_id).where(CartLine.cart_id == cart_id, CartLine.product_id.in_(list(quantities)))
+    )).scalars())
+    for product_id in existing:
+        quantity = quantities[product_id] if replace else CartLine.quantity + quantities[product_id]
+        await db.execute(
+            update(CartLine).where(CartLine.cart_id == cart_id, CartLine.product_id == product_id).values(quantity=quantity)
+        )
+    new = [product_id for product_id in quantities if product_id not in existing]
+    if new:
+        position = await db.scalar(select(func.coalesce(func.max(CartLine.position), -1) + 1).where(CartLine.cart_id == cart_id))
+        db.add_all(
+            CartLine(cart_id=cart_id, product_id=product_id, quantity=quantities[product_id], position=position + offset)
+            for offset, product_id in enumerate(new)
         )
-        db.add(cart)
+
+@api_router.post("/cart")
+async def update_cart(
+    cart_data: CartUpdate,
+    if_match: Optional[str] = Header(None),
+    user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Whole-cart replace, kept for older clients; prefer the /cart/items routes
+    cart_id, version = await lock_cart(db, user.id, expected_cart_version(if_match))
+    await db.execute(delete(CartLine).where(CartLine.cart_id == cart_id))
+    db.add_all(
+        CartLine(cart_id=cart_id, product_id=product_id, quantity=quantity, position=position)
+        for position, (product_id, quantity) in enumerate(order_quantities(cart_data.items).items())
+    )
     
     await db.commit()   
-    return {"message": "Cart updated"}
+    return {"message": "Cart updated", "version": version}
+
+@api_router.post("/cart/items")
+async def add_cart_item(
+    change: CartLineChange,
+    if_match: Optional[str] = Header(None),
+    user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    await require_products(db, [change.product_id])
+    cart_id, version = await lock_cart(db, user.id, expected_cart_version(if_match))
+    await add_cart_quantities(db, cart_id, {change.product_id: change.quantity})
+    await db.commit()
+    return await cart_change(db, cart_id, version, [change.product_id])
+
+@api_router.put("/cart/items/{product_id}")
+async def set_cart_item(
+    product_id: str,
+    change: CartQuantity,
+    if_match: Optional[str] = Header(None),
+    user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    await require_products(db, [product_id])
+    cart_id, version = await lock_cart(db, user.id, expected_cart_version(if_match))
+    await add_cart_quantities(db, cart_id, {product_id: change.quantity}, replace=True)
+    await db.commit()
+    return await cart_change(db, cart_id, version, [product_id])
+
+@api_router.delete("/cart/items/{product_id}")
+async def remove_cart_item(
+    product_id: str,
+    if_match: Optional[str] = Header(None),
+    user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    cart_id, version = await lock_cart(db, user.id, expected_cart_version(if_match))
+    result = await db.execute(delete(CartLine).where(CartLine.cart_id == cart_id, CartLine.product_id == product_id))
+    if result.rowcount == 0:
+        # Nothing to remove: leave the version alone so other tabs are not forced to reload
+        await db.rollback()
+        version -= 1
+    else:
+        await db.commit()
+    return await cart_change(db, cart_id, version, [product_id])
+
+@api_router.post("/cart/merge")
+async def merge_cart(
+    cart_data: CartUpdate,
+    user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Folds a guest cart into the user's cart after login: quantities add up, new products go last.
+    # Products that no longer exist are skipped and reported rather than failing the login flow.
+    quantities = {product_id: quantity for product_id, quantity in order_quantities(cart_data.items).items() if quantity > 0}
+    found = await load_product_payloads(db, quantities)
+    missing = [product_id for product_id in quantities if product_id not in found]
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if product_id in found}
+    cart_id, version = await lock_cart(db, user.id, None)
+    if quantities:
+        await add_cart_quantities(db, cart_id, quantities)
+    await db.commit()
+    return {**await cart_change(db, cart_id, version, quantities), "missing": missing}
 
 # ============= WISHLIST ROUTES =============
 @api_router.get("/wishlist")
-async def get_wishlist(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Wishlist).where(Wishlist.user_id == user.id))
-    wishlist = result.scalar_one_or_none()
-    if not wishlist:
-        return {"products": []}
-    
-    product_ids = json.loads(wishlist.product_ids) if wishlist.product_ids else []
-    products = []
-    for product_id in product_ids:
-        result = await db.execute(select(Product).where(Product.id == product_id))
-        product = result.scalar_one_or_none()
-        if product:
-            products.append(serialize_product(product))
+async def get_wishlist(user: TokenUser = Depends(get_token_user), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(WishlistItem.product_id)
+        .join(Wishlist, WishlistItem.wishlist_id == Wishlist.id)
+        .where(Wishlist.user_id == user.id)
+        .order_by(WishlistItem.position, WishlistItem.created_at)
+    )
+    product_ids = result.scalars().all()
+    found = await load_product_payloads(db, product_ids)
+    products = [found[pid] for pid in product_ids if pid in found]
     
     return {"products": products}
 
+async def user_wishlist_id(db: AsyncSession, user_id: str) -> str:
+    wishlist_id = await db.scalar(select(Wishlist.id).where(Wishlist.user_id == user_id))
+    if wishlist_id is None:
+        db.add(Wishlist(id=str(uuid.uuid4()), user_id=user_id))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another request created it first (wishlists.user_id is unique)
+            await db.rollback()
+        wishlist_id = await db.scalar(select(Wishlist.id).where(Wishlist.user_id == user_id))
+    return wishlist_id
+
 @api_router.post("/wishlist/{product_id}")
-async def add_to_wishlist(product_id: str, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Wishlist).where(Wishlist.user_id == user.id))
-    wishlist = result.scalar_one_or_none()
-    
-    if wishlist:
-        product_ids = json.loads(wishlist.product_ids) if wishlist.product_ids else []
-        if product_id not in product_ids:
-            product_ids.append(product_id)
-        wishlist.product_ids = json.dumps(product_ids)
-    else:
-        wishlist = Wishlist(
-            id=str(uuid.uuid4()),
-            user_id=user.id,
-            product_ids=json.dumps([product_id])
-        )
-        db.add(wishlist)
-    
-    await db.commit()
+async def add_to_wishlist(product_id: str, user: UserResponse = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    wishlist = await user_wishlist_id(db, user.id)
+    if await db.get(WishlistItem, (wishlist, product_id)):
+        return {"message": "Added to wishlist"}
+    position = await db.scalar(
+        select(func.coalesce(func.max(WishlistItem.position), -1) + 1).where(WishlistItem.wishlist_id == wishlist)
+    )
+    db.add(WishlistItem(wishlist_id=wishlist, product_id=product_id, position=position))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent add of the same product won; adding is idempotent
+        await db.rollback()
     return {"message": "Added to wishlist"}
 
 @api_router.delete("/wishlist/{product_id}")
-async def remove_from_wishlist(product_id: str, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Wishlist).where(Wishlist.user_id == user.id))
-    wishlist = result.scalar_one_or_none()
-    if wishlist:
-        product_ids = json.loads(wishlist.product_ids) if wishlist.product_ids else []
-        if product_id in product_ids:
-            product_ids.remove(product_id)
-        wishlist.product_ids = json.dumps(product_ids)
-        await db.commit()
+async def remove_from_wishlist(product_id: str, user: UserResponse = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    await db.execute(
+        delete(WishlistItem)
+        .where(WishlistItem.wishlist_id.in_(select(Wishlist.id).where(Wishlist.user_id == user.id)))
+        .where(WishlistItem.product_id == product_id)
+    )
+    await db.commit()
     return {"message": "Removed from wishlist"}
 
 # ============= REVIEW ROUTES =============
 @api_router.get("/reviews/{product_id}", response_model=List[ReviewResponse])
-async def get_reviews(product_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Review).where(Review.product_id == product_id))
+async def get_reviews(product_id: str, request: Request, db: AsyncSession = Depends(get_read_db)):
+    not_modified, headers = conditional_get(request, f"reviews:{product_id}")
+    if not_modified:
+        return not_modified
+    # Stable order so equal ETags always mean byte-identical bodies
+    result = await db.execute(select(Review).where(Review.product_id == product_id).order_by(Review.created_at, Review.id))
     reviews = result.scalars().all()
-    return [ReviewResponse.model_validate(r) for r in reviews]
+    return fast_response([review_row(r) for r in reviews], headers)
 
 @api_router.post("/reviews", response_model=ReviewResponse)
-async def create_review(review_data: ReviewCreate, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def create_review(review_data: ReviewCreate, user: UserResponse = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     review_id = str(uuid.uuid4())
     review = Review(
         id=review_id,
@@ -539,56 +1339,94 @@ async def create_review(review_data: ReviewCreate, user: User = Depends(get_curr
         comment=review_data.comment
     )
     db.add(review)
+    # Fold the new rating into the running average in the same transaction as the
+    # insert. A single UPDATE is atomic per row, so concurrent reviews cannot lose
+    # each other. ratings_avg is assigned first: MySQL evaluates SET left to right,
+    # so it must still see the old ratings_count.
+    result = await db.execute(
+        update(Product)
+        .where(Product.id == review_data.product_id)
+        .ordered_values(
+            (Product.ratings_avg, (Product.ratings_avg * Product.ratings_count + review_data.rating) / (Product.ratings_count + 1)),
+            (Product.ratings_count, Product.ratings_count + 1),
+        )
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Product not found")
     await db.commit()
-    
-    result = await db.execute(select(Review).where(Review.product_id == review_data.product_id))
-    all_reviews = result.scalars().all()
-    avg_rating = sum(r.rating for r in all_reviews) / len(all_reviews) if all_reviews else 0
-    
-    result = await db.execute(select(Product).where(Product.id == review_data.product_id))
-    product = result.scalar_one_or_none()
-    if product:
-        product.ratings_avg = avg_rating
-        product.ratings_count = len(all_reviews)
-        await db.commit()
-    
-    await db.refresh(review)
+    invalidation_bus.publish(f"product:{review_data.product_id}", f"reviews:{review_data.product_id}")
+    # The new average was computed by the database; re-read it for the rating facet
+    spawn(refresh_search_document(review_data.product_id))
     return ReviewResponse.model_validate(review)
 
 # ============= PAYMENT & ORDER ROUTES =============
 @api_router.post("/payment/create-order")
-async def create_payment_order(order_data: PaymentOrderCreate, user: User = Depends(get_current_user)):
+async def create_payment_order(order_data: PaymentOrderCreate, user: UserResponse = Depends(get_current_user)):
     try:
-        order = razorpay_client.order.create({
-            "amount": int(order_data.amount * 100),
-            "currency": "INR",
-            "payment_capture": 1
-        })
-        return order
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return await payment_gateway.create_order(int(round(order_data.amount * 100)), currency="INR")
+    except PaymentGatewayError as e:
+        raise HTTPException(status_code=502, detail=str(e))
 
 @api_router.post("/payment/verify")
-async def verify_payment(payment_data: PaymentVerify, user: User = Depends(get_current_user)):
-    try:
-        params_dict = {
-            "razorpay_order_id": payment_data.razorpay_order_id,
-            "razorpay_payment_id": payment_data.razorpay_payment_id,
-            "razorpay_signature": payment_data.razorpay_signature
-        }
-        razorpay_client.utility.verify_payment_signature(params_dict)
-        return {"status": "verified"}
-    except:
+async def verify_payment(payment_data: PaymentVerify, user: UserResponse = Depends(get_current_user)):
+    if not payment_gateway.verify_signature(
+        payment_data.razorpay_order_id,
+        payment_data.razorpay_payment_id,
+        payment_data.razorpay_signature,
+    ):
         raise HTTPException(status_code=400, detail="Payment verification failed")
+    return {"status": "verified"}
 
 @api_router.post("/orders", response_model=OrderResponse)
-async def create_order(order_data: OrderCreate, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def create_order(
+    order_data: OrderCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await run_idempotent(
+        idempotency_key, user.id, "orders.create", order_data.model_dump(), db,
+        lambda: place_order(order_data, user, db),
+    )
+
+async def place_order(order_data: OrderCreate, user: UserResponse, db: AsyncSession) -> OrderResponse:
     order_id = str(uuid.uuid4())
+    quantities = order_quantities(order_data.items)
+    products = await load_products_by_ids(db, quantities)
+    priced = quote(quantities.items(), price_book(products.values()))
+    if priced.missing:
+        raise HTTPException(status_code=400, detail={"message": "Unknown products", "product_ids": priced.missing})
+    unit_prices = {line.product_id: line.unit_paise for line in priced.lines}
+    changed = [
+        item.product_id for item in order_data.items
+        if item.price is not None and to_paise(item.price) != unit_prices[item.product_id]
+    ]
+    if changed or to_paise(order_data.total_amount) != priced.total_paise:
+        raise HTTPException(status_code=409, detail={
+            "message": "Order total does not match current prices",
+            "total_amount": from_paise(priced.total_paise),
+            "changed_prices": list(dict.fromkeys(changed)),
+        })
+    try:
+        await reserve_stock(db, order_id, quantities, RESERVATION_TTL)
+    except OutOfStock as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail={"message": "Insufficient stock", "product_ids": e.product_ids})
     order = Order(
         id=order_id,
         user_id=user.id,
-        items=json.dumps([item.model_dump() for item in order_data.items]),
-        total_amount=order_data.total_amount,
+        lines=[
+            OrderLine(
+                position=position,
+                product_id=line.product_id,
+                product_name=line.product_name,
+                price=from_paise(line.unit_paise),
+                quantity=line.quantity,
+            )
+            for position, line in enumerate(priced.lines)
+        ],
+        total_amount=from_paise(priced.total_paise),
         shipping_address=json.dumps(order_data.shipping_address),
         razorpay_order_id=order_data.razorpay_order_id,
         payment_status="pending",
@@ -596,23 +1434,36 @@ async def create_order(order_data: OrderCreate, user: User = Depends(get_current
     )
     db.add(order)
     
-    result = await db.execute(select(Cart).where(Cart.user_id == user.id))
-    cart = result.scalar_one_or_none()
-    if cart:
-        await db.delete(cart)
+    # Empty the cart but keep its row: the version must keep counting up for other open tabs
+    await db.execute(delete(CartLine).where(CartLine.cart_id.in_(select(Cart.id).where(Cart.user_id == user.id))))
+    await db.execute(update(Cart).where(Cart.user_id == user.id).values(version=Cart.version + 1))
     
-    await db.commit()
+    await db.flush()
     await db.refresh(order)
-    return serialize_order(order)
-
-@api_router.get("/orders", response_model=List[OrderResponse])
-async def get_orders(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Order).where(Order.user_id == user.id).order_by(Order.created_at.desc()).limit(1000))
+    response = serialize_order(order)
+    await commit_response(db, response)
+    invalidation_bus.publish(*(f"product:{product_id}" for product_id in quantities))
+    return response
+
+@api_router.get("/orders", response_model=Union[OrderPage, List[OrderResponse]])
+async def get_orders(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    query = select(Order).where(Order.user_id == user.id)
+    if limit is not None or cursor is not None:
+        page_size = limit or DEFAULT_PAGE_SIZE
+        result = await db.execute(paginate(query, ORDER_SORT, cursor, page_size))
+        orders, next_cursor = page_of(result.scalars().all(), ORDER_SORT, page_size)
+        return fast_response({"items": [order_row(o) for o in orders], "next_cursor": next_cursor})
+    result = await db.execute(query.order_by(Order.created_at.desc()).limit(LEGACY_LIST_LIMIT))
     orders = result.scalars().all()
-    return [serialize_order(o) for o in orders]
+    return fast_response([order_row(o) for o in orders])
 
 @api_router.get("/orders/{order_id}", response_model=OrderResponse)
-async def get_order(order_id: str, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def get_order(order_id: str, user: TokenUser = Depends(get_token_user), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Order).where((Order.id == order_id) & (Order.user_id == user.id)))
     order = result.scalar_one_or_none()
     if not order:
@@ -621,59 +1472,270 @@ async def get_order(order_id: str, user: User = Depends(get_current_user), db: A
 
 
 @api_router.patch("/orders/{order_id}/payment")
-async def update_order_payment(order_id: str, payment_id: str, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Order).where((Order.id == order_id) & (Order.user_id == user.id)))
+async def update_order_payment(
+    order_id: str,
+    payment_id: str,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await run_idempotent(
+        idempotency_key, user.id, "orders.payment", {"order_id": order_id, "payment_id": payment_id}, db,
+        lambda: record_order_payment(order_id, payment_id, user, db),
+    )
+
+async def record_order_payment(order_id: str, payment_id: str, user: UserResponse, db: AsyncSession) -> dict:
+    result = await db.execute(
+        select(Order).where((Order.id == order_id) & (Order.user_id == user.id)).with_for_update()
+    )
     order = result.scalar_one_or_none()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    order_status = "confirmed"
+    restocked = []
+    # Decide from the holds, not the order status: with the order locked, the sweeper and
+    # an admin cancel have either released the stock already or cannot until we commit
+    if not await commit_reservations(db, order.id) and order.payment_status != "completed" and await holds_released(db, order.id):
+        # Paid after the stock went back: take it again if it is still there,
+        # otherwise keep the payment and leave the order for an admin to resolve
+        quantities = order_quantities(order.lines)
+        try:
+            async with db.begin_nested():
+                await reserve_stock(db, order.id, quantities, RESERVATION_TTL)
+            await commit_reservations(db, order.id)
+            restocked = list(quantities)
+        except OutOfStock:
+            order_status = "backorder"
     order.razorpay_payment_id = payment_id
     order.payment_status = "completed"
-    order.order_status = "confirmed"
-    await db.commit()
-    return {"message": "Payment updated"}
+    order.order_status = order_status
+    response = {"message": "Payment updated"}
+    await commit_response(db, response)
+    if restocked:
+        invalidation_bus.publish(*(f"product:{product_id}" for product_id in restocked))
+    return response
 
 # ============= ADMIN ROUTES =============
-@api_router.get("/admin/orders", response_model=List[OrderResponse])
-async def get_all_orders(admin: User = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Order).order_by(Order.created_at.desc()).limit(1000))
+@api_router.get("/admin/orders", response_model=Union[OrderPage, List[OrderResponse]])
+async def get_all_orders(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    admin: UserResponse = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if limit is not None or cursor is not None:
+        page_size = limit or DEFAULT_PAGE_SIZE
+        result = await db.execute(paginate(select(Order), ORDER_SORT, cursor, page_size))
+        orders, next_cursor = page_of(result.scalars().all(), ORDER_SORT, page_size)
+        return fast_response({"items": [order_row(o) for o in orders], "next_cursor": next_cursor})
+    result = await db.execute(select(Order).order_by(Order.created_at.desc()).limit(LEGACY_LIST_LIMIT))
     orders = result.scalars().all()
-    return [serialize_order(o) for o in orders]
+    return fast_response([order_row(o) for o in orders])
 
 @api_router.patch("/admin/orders/{order_id}")
-async def update_order_status(order_id: str, order_status: str, admin: User = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Order).where(Order.id == order_id))
+async def update_order_status(order_id: str, order_status: str, admin: UserResponse = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Order).where(Order.id == order_id).with_for_update())
     order = result.scalar_one_or_none()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    # A cancelled order must not keep its stock held until the reservation expires
+    restocked = await release_order(db, order.id) if order_status == "cancelled" else set()
     order.order_status = order_status
     await db.commit()
+    if restocked:
+        invalidation_bus.publish(*(f"product:{product_id}" for product_id in restocked))
     return {"message": "Order status updated"}
 
 @api_router.get("/admin/users")
-async def get_all_users(admin: User = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).limit(1000))
+async def get_all_users(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    admin: UserResponse = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if limit is not None or cursor is not None:
+        page_size = limit or DEFAULT_PAGE_SIZE
+        result = await db.execute(paginate(select(User), USER_SORT, cursor, page_size))
+        users, next_cursor = page_of(result.scalars().all(), USER_SORT, page_size)
+        return fast_response({"items": [user_row(u) for u in users], "next_cursor": next_cursor})
+    result = await db.execute(select(User).limit(LEGACY_LIST_LIMIT))
     users = result.scalars().all()
-    return [UserResponse.model_validate(u) for u in users]
+    return fast_response([user_row(u) for u in users])
+
+def export_response(name: str, fmt: str, columns: List[str], query, to_rows) -> StreamingResponse:
+    # The session lives inside the body generator: yield dependencies are already
+    # closed by the time a StreamingResponse starts sending
+    async def body():
+        async with async_session() as db:
+            result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+            async for chunk in encode_rows(to_rows(result), fmt, columns, EXPORT_CHUNK_ROWS):
+                yield chunk
+
+    filename = f"{name}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+async def order_export_rows(result):
+    # One joined row per order line, ordered by order; fold them back into orders
+    order = None
+    async for row in result:
+        if order is None or order["id"] != row.id:
+            if order is not None:
+                yield order
+            order = {
+                "id": row.id,
+                "user_id": row.user_id,
+                "created_at": row.created_at,
+                "payment_status": row.payment_status,
+                "order_status": row.order_status,
+                "total_amount": row.total_amount,
+                "razorpay_order_id": row.razorpay_order_id,
+                "razorpay_payment_id": row.razorpay_payment_id,
+                "item_count": 0,
+                "items": [],
+                "shipping_address": json.loads(row.shipping_address),
+            }
+        if row.product_id is not None:
+            order["items"].append({"product_id": row.product_id, "product_name": row.product_name, "price": row.price, "quantity": row.quantity})
+            order["item_count"] += row.quantity
+    if order is not None:
+        yield order
+
+async def mapping_rows(result):
+    async for row in result:
+        yield dict(row._mapping)
+
+@api_router.get("/admin/orders/export")
+async def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    payment_status: Optional[str] = None,
+    order_status: Optional[str] = None,
+    admin: UserResponse = Depends(get_admin_user)
+):
+    # Plain columns rather than ORM objects: nothing accumulates in a session identity map,
+    # and a single cursor serves both tables so MySQL never needs a second query mid-stream
+    query = (
+        select(
+            Order.id, Order.user_id, Order.created_at, Order.payment_status, Order.order_status,
+            Order.total_amount, Order.razorpay_order_id, Order.razorpay_payment_id, Order.shipping_address,
+            OrderLine.product_id, OrderLine.product_name, OrderLine.price, OrderLine.quantity,
+        )
+        .outerjoin(OrderLine, OrderLine.order_id == Order.id)
+        .order_by(Order.created_at, Order.id, OrderLine.position)
+    )
+    if created_from is not None:
+        query = query.where(Order.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(Order.created_at < created_to)
+    if payment_status:
+        query = query.where(Order.payment_status == payment_status)
+    if order_status:
+        query = query.where(Order.order_status == order_status)
+    return export_response("orders", format, ORDER_EXPORT_COLUMNS, query, order_export_rows)
+
+@api_router.get("/admin/users/export")
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    role: Optional[str] = None,
+    admin: UserResponse = Depends(get_admin_user)
+):
+    query = select(User.id, User.email, User.name, User.phone, User.role, User.created_at).order_by(User.created_at, User.id)
+    if created_from is not None:
+        query = query.where(User.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(User.created_at < created_to)
+    if role:
+        query = query.where(User.role == role)
+    return export_response("users", format, USER_EXPORT_COLUMNS, query, mapping_rows)
+
+@api_router.get("/admin/products/export")
+async def export_products(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    category: Optional[str] = None,
+    admin: UserResponse = Depends(get_admin_user)
+):
+    # Same columns scripts/catalog.py import reads back, so an export is a catalog backup
+    query = select(*(getattr(Product, column) for column in PRODUCT_EXPORT_COLUMNS)).order_by(Product.id)
+    if category:
+        query = query.where(Product.category == category)
+    return export_response("products", format, PRODUCT_EXPORT_COLUMNS, query, mapping_rows)
+
+async def compute_admin_stats(db: AsyncSession, breakdown: bool, days: int) -> dict:
+    # All headline numbers in one round trip, summed by the database rather than in Python
+    totals = (await db.execute(select(
+        select(func.count(Product.id)).scalar_subquery().label("total_products"),
+        select(func.count(Order.id)).scalar_subquery().label("total_orders"),
+        select(func.count(User.id)).where(User.role == "customer").scalar_subquery().label("total_users"),
+        select(func.coalesce(func.sum(Order.total_amount), 0.0)).where(Order.payment_status == "completed").scalar_subquery().label("total_revenue"),
+    ))).one()
+    stats = {
+        "total_products": totals.total_products or 0,
+        "total_orders": totals.total_orders or 0,
+        "total_users": totals.total_users or 0,
+        "total_revenue": round(totals.total_revenue or 0.0, 2),
+    }
+    if breakdown:
+        completed_revenue = func.coalesce(func.sum(case((Order.payment_status == "completed", Order.total_amount), else_=0.0)), 0.0)
+        day = func.date(Order.created_at)
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        result = await db.execute(
+            select(day.label("day"), func.count(Order.id), completed_revenue)
+            .where(Order.created_at >= since)
+            .group_by(day)
+            .order_by(day)
+        )
+        stats["by_day"] = [
+            {"day": str(d), "orders": count, "revenue": round(revenue, 2)}
+            for d, count, revenue in result.all()
+        ]
+        result = await db.execute(
+            select(Order.order_status, func.count(Order.id), completed_revenue).group_by(Order.order_status)
+        )
+        stats["by_status"] = [
+            {"order_status": status, "orders": count, "revenue": round(revenue, 2)}
+            for status, count, revenue in result.all()
+        ]
+    stats["generated_at"] = datetime.now(timezone.utc).isoformat()
+    return stats
 
 @api_router.get("/admin/stats")
-async def get_admin_stats(admin: User = Depends(get_admin_user), db: AsyncSession = Depends(get_db)):
-    total_products = await db.scalar(select(func.count(Product.id)))
-    total_orders = await db.scalar(select(func.count(Order.id)))
-    total_users = await db.scalar(select(func.count(User.id)).where(User.role == "customer"))
-    
-    result = await db.execute(select(Order).where(Order.payment_status == "completed").limit(10000))
-    orders = result.scalars().all()
-    total_revenue = sum(order.total_amount for order in orders)
-    
+async def get_admin_stats(
+    breakdown: bool = False,
+    days: int = Query(30, ge=1, le=366),
+    admin: UserResponse = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    key = (breakdown, days if breakdown else None)
+    stats = admin_stats_cache.get(key)
+    if stats is None:
+        stats = await compute_admin_stats(db, breakdown, days)
+        admin_stats_cache.set(key, stats)
+    return stats
+
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(admin: UserResponse = Depends(get_admin_user)):
     return {
-        "total_products": total_products or 0,
-        "total_orders": total_orders or 0,
-        "total_users": total_users or 0,
-        "total_revenue": total_revenue
+        "products": product_cache.stats(),
+        "users": user_cache.stats(),
+        "admin_stats": admin_stats_cache.stats(),
+        "invalidation": {"published": invalidation_bus.published, "received": invalidation_bus.received},
+        "idempotency": idempotency_store.stats(),
+        "singleflight": {"product": product_flights.stats(), "listing": listing_flights.stats()},
     }
 
+@api_router.get("/admin/password-pool/stats")
+async def get_password_pool_stats(admin: UserResponse = Depends(get_admin_user)):
+    return password_pool.stats()
+
 app.include_router(api_router)
 
 logging.basicConfig(
@@ -686,7 +1748,20 @@ logger = logging.getLogger(__name__)
 async def startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await invalidation_bus.start()
+    await rebuild_search_index()
+    await rebuild_facet_index()
+    spawn(sweep_reservations())
+    spawn(sweep_idempotency_keys())
+    spawn(loop_lag.run())
 
 @app.on_event("shutdown")
 async def shutdown():
+    for task in list(background_tasks):
+        task.cancel()
+    await invalidation_bus.stop()
+    password_pool.shutdown()
+    await payment_gateway.aclose()
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
@@ -0,0 +1,62 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesces concurrent identical reads into one call.
+
+    The first caller for a key starts ``fn`` as its own task; callers that
+    arrive while it runs await that same task instead of starting another.
+    The key is dropped as soon as the call finishes, so nothing is served
+    after the fact. ``forget``/``clear`` detach in-flight calls on writes:
+    requests arriving after an invalidation start a fresh read instead of
+    joining one that may have seen the old rows.
+
+    The call is shielded from its callers: a client disconnecting does not
+    cancel the read the other waiters depend on.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.forgotten = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.get_running_loop().create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved: every waiter may have gone away
+            task.exception()
+
+    def forget(self, key: Hashable) -> None:
+        if self._calls.pop(key, None) is not None:
+            self.forgotten += 1
+
+    def clear(self) -> None:
+        self.forgotten += len(self._calls)
+        self._calls.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.calls + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / requests, 4) if requests else 0.0,
+            "forgotten": self.forgotten,
+        }
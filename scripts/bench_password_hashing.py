@@ -0,0 +1,192 @@
+"""Catalog latency while a burst of logins is being verified.
+
+Runs the FastAPI app through httpx's ASGI transport against a throwaway
+SQLite database. --readers clients keep calling GET /api/products while
+--logins concurrent POST /api/auth/login requests go through, and the
+catalog p50/p99 is reported three ways: with no logins, during the burst
+with bcrypt on ``server.password_pool`` (the shipped setup), and during the
+burst with bcrypt called inline on the event loop, as the handlers did
+before. With the pool the burst row should stay close to the quiet row.
+
+    python scripts/bench_password_hashing.py --logins 40 --rounds 12
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+CATEGORIES = ["kitchen", "laundry", "cleaning", "power-tools", "cooling"]
+PASSWORD = "bench-password"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def configure_env(database_url, workers):
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["DATABASE_REPLICA_URL"] = ""
+    os.environ["PASSWORD_POOL_WORKERS"] = str(workers)
+    os.environ.setdefault("PAYMENT_GATEWAY", "fake")
+    os.environ.setdefault("INVALIDATION_BACKEND", "memory")
+    os.environ.setdefault("SLOW_REQUEST_SECONDS", "60")
+    for name, value in (("JWT_SECRET", "bench-only-secret-not-for-production"), ("JWT_ALGORITHM", "HS256"),
+                        ("RAZORPAY_KEY_ID", "bench"), ("RAZORPAY_KEY_SECRET", "bench"),
+                        ("JWT_EXPIRATION_HOURS", "24")):
+        os.environ.setdefault(name, value)
+
+
+class InlineHashing:
+    """Stands in for ``server.password_pool``: runs the hash on the event loop."""
+
+    async def run(self, fn, *args):
+        return fn(*args)
+
+    def stats(self):
+        return {}
+
+    def shutdown(self):
+        pass
+
+
+async def seed(server, rng, products):
+    from models import Product, User
+
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    async with server.async_session() as db:
+        db.add_all(
+            Product(
+                id=str(uuid.UUID(int=rng.getrandbits(128))), name=f"Bosch Product {i}", description="Bench product",
+                price=round(rng.uniform(499, 149999), 2), category=rng.choice(CATEGORIES), images=[],
+                stock=1000, specifications={}, created_at=created.replace(microsecond=i),
+            )
+            for i in range(products)
+        )
+        db.add(User(id=str(uuid.uuid4()), email="bench@example.com", password=server.hash_password(PASSWORD),
+                    name="Bench User", role="customer", created_at=created))
+        await db.commit()
+    await server.rebuild_search_index()
+    await server.rebuild_facet_index()
+
+
+async def catalog_reads(client, rng, readers, until):
+    latencies, errors = [], 0
+
+    async def reader():
+        nonlocal errors
+        while not until():
+            params = {"limit": 24, "sort": rng.choice(["newest", "price_asc", "rating"])}
+            if rng.random() < 0.5:
+                params["category"] = rng.choice(CATEGORIES)
+            started = time.perf_counter()
+            response = await client.get("/api/products", params=params)
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += response.status_code >= 400
+
+    await asyncio.gather(*(reader() for _ in range(readers)))
+    return latencies, errors
+
+
+async def measure(client, rng, args, logins):
+    """Catalog latencies while ``logins`` logins run (or for --quiet-seconds with none)."""
+    done = asyncio.Event()
+    login_status = []
+
+    async def burst():
+        async def login():
+            response = await client.post("/api/auth/login", json={"email": "bench@example.com", "password": PASSWORD})
+            login_status.append(response.status_code)
+
+        # Let the readers get going before the burst starts
+        await asyncio.sleep(0.05)
+        await asyncio.gather(*(login() for _ in range(logins)))
+        done.set()
+
+    async def quiet():
+        await asyncio.sleep(args.quiet_seconds)
+        done.set()
+
+    started = time.perf_counter()
+    (latencies, errors), _ = await asyncio.gather(
+        catalog_reads(client, rng, args.readers, done.is_set),
+        burst() if logins else quiet(),
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        "catalog_requests": len(latencies),
+        "catalog_errors": errors,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+        "logins_ok": sum(status == 200 for status in login_status),
+        "logins_per_s": len(login_status) / elapsed,
+    }
+
+
+async def bench(args):
+    configure_env(args.database_url, args.workers)
+    import httpx
+
+    import server
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    server.pwd_context.update(bcrypt__rounds=args.rounds)
+    rng = random.Random(args.seed)
+    await server.app.router.startup()
+    pool = server.password_pool
+    results = {}
+    try:
+        await seed(server, rng, args.products)
+        transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Warm the listing path so the first rows do not pay for it
+            for _ in range(20):
+                await client.get("/api/products", params={"limit": 24})
+            results["quiet"] = await measure(client, rng, args, 0)
+            results["pool"] = await measure(client, rng, args, args.logins)
+            server.password_pool = InlineHashing()
+            results["inline"] = await measure(client, rng, args, args.logins)
+    finally:
+        server.password_pool = pool
+        await server.app.router.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--logins", type=int, default=40, help="concurrent logins in the burst")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_POOL_WORKERS")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent catalog clients")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--quiet-seconds", type=float, default=2.0, help="length of the no-login run")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if not args.database_url:
+        args.database_url = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite')}"
+
+    print(f"{args.logins} concurrent logins, bcrypt cost {args.rounds}, pool workers {args.workers}, {args.readers} catalog readers")
+    results = asyncio.run(bench(args))
+    print(f"{'hashing':<8} {'logins ok':>9} {'logins/s':>9} {'catalog reqs':>12} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for mode in ("quiet", "pool", "inline"):
+        r = results[mode]
+        logins = f"{r['logins_ok']:>9} {r['logins_per_s']:>9.1f}" if mode != "quiet" else f"{'-':>9} {'-':>9}"
+        print(f"{mode:<8} {logins} {r['catalog_requests']:>12} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+        if r["catalog_errors"]:
+            print(f"         {r['catalog_errors']} catalog requests failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Throughput of the big list endpoints with and without the fast JSON path.
+
+Seeds a throwaway SQLite database, then hits GET /api/products and
+GET /api/admin/orders (1000-row legacy lists) in-process through the ASGI
+app. Each mode runs in a fresh interpreter because FAST_JSON_RESPONSES is
+read at import time: "validated" is the old response_model path, "fast"
+hands prebuilt rows to orjson. Response bodies are compared across modes.
+
+    python scripts/bench_serialization.py --products 1000 --orders 1000 --requests 30
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from models import Base, Order, OrderLine, Product  # noqa: E402
+
+ENDPOINTS = ["/api/products", "/api/admin/orders"]
+
+
+async def seed(url, products, orders):
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    catalog = [
+        Product(
+            id=str(uuid.uuid4()), name=f"Bosch GSB {i} Impact Drill", description="Compact drill " * 20,
+            price=1999.0 + i, category=f"category-{i % 12}", images=[f"https://cdn.example.com/p/{i}/{n}.jpg" for n in range(4)],
+            stock=100, specifications={"power": "650 W", "weight": "1.8 kg", "chuck": "13 mm"},
+            ratings_avg=4.2, ratings_count=i % 50, created_at=started + timedelta(minutes=i),
+        )
+        for i in range(products)
+    ]
+    history = [
+        Order(
+            id=str(uuid.uuid4()), user_id=str(uuid.uuid4()),
+            lines=[
+                OrderLine(position=n, product_id=catalog[(i + n) % products].id, product_name=catalog[(i + n) % products].name,
+                          price=catalog[(i + n) % products].price, quantity=1 + n)
+                for n in range(3)
+            ],
+            total_amount=6000.0, shipping_address=json.dumps({"city": "Pune", "pincode": "411001"}),
+            razorpay_order_id=f"order_{i}", payment_status="completed", order_status="confirmed",
+            created_at=started + timedelta(minutes=i),
+        )
+        for i in range(orders)
+    ]
+    async with AsyncSession(engine) as db:
+        db.add_all(catalog)
+        db.add_all(history)
+        await db.commit()
+    await engine.dispose()
+
+
+async def measure(requests):
+    import httpx
+
+    import server  # reads FAST_JSON_RESPONSES and DATABASE_URL at import
+
+    server.app.dependency_overrides[server.get_admin_user] = lambda: None
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ENDPOINTS:
+            body = (await client.get(path)).content  # warm caches and the connection pool
+            timings = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = await client.get(path)
+                timings.append(time.perf_counter() - started)
+                response.raise_for_status()
+            rows = json.loads(body)
+            results[path] = {
+                "rows": len(rows),
+                "bytes": len(body),
+                "digest": hashlib.sha256(json.dumps(rows, sort_keys=True).encode()).hexdigest()[:12],
+                "median_ms": statistics.median(timings) * 1000,
+                "per_s": len(timings) / sum(timings),
+            }
+    await server.engine.dispose()
+    return results
+
+
+def child(args):
+    for name, value in {
+        "JWT_SECRET": "bench", "JWT_ALGORITHM": "HS256", "RAZORPAY_KEY_ID": "bench", "RAZORPAY_KEY_SECRET": "bench",
+        "PAYMENT_GATEWAY": "fake", "INVALIDATION_BACKEND": "memory",
+    }.items():
+        os.environ.setdefault(name, value)
+    # Every engine in server, including the read sessions, must point at the bench database
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DATABASE_REPLICA_URL"] = ""
+    if args.seed:
+        asyncio.run(seed(args.database_url, args.products, args.orders))
+    else:
+        print(json.dumps(asyncio.run(measure(args.requests))))
+
+
+def main(args):
+    url = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite')}"
+    base = [sys.executable, __file__, "--child", "--database-url", url,
+            "--products", str(args.products), "--orders", str(args.orders), "--requests", str(args.requests)]
+    subprocess.run(base + ["--seed"], check=True)
+    modes = {}
+    for mode, flag in (("validated", "false"), ("fast", "true")):
+        out = subprocess.run(base, check=True, capture_output=True, text=True, env={**os.environ, "FAST_JSON_RESPONSES": flag})
+        modes[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"{args.products} products, {args.orders} orders, {args.requests} requests per endpoint")
+    print(f"{'endpoint':<20} {'mode':<10} {'rows':>5} {'KiB':>7} {'median':>9} {'req/s':>7}")
+    for path in ENDPOINTS:
+        for mode, results in modes.items():
+            r = results[path]
+            print(f"{path:<20} {mode:<10} {r['rows']:>5} {r['bytes'] / 1024:>7.0f} {r['median_ms']:>7.1f}ms {r['per_s']:>7.1f}")
+        baseline, fast = modes["validated"][path], modes["fast"][path]
+        same = "identical" if baseline["digest"] == fast["digest"] else "DIFFERENT"
+        print(f"{'':<20} speedup {baseline['median_ms'] / fast['median_ms']:.2f}x, bodies {same}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--database-url", help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+    else:
+        main(args)
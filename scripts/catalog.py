@@ -0,0 +1,145 @@
+"""Bulk catalog import, export and synthetic catalog generation.
+
+Imports stream CSV or NDJSON (chosen by file suffix or --format), validate
+every row against ProductCreate and upsert in multi-row batches, one
+transaction per batch. Rows carrying an existing ``id`` update that
+product; ratings and created_at are left alone. Bad rows are reported with
+their line number and skipped. Running workers drop their caches and
+rebuild their search index once the import finishes.
+
+    python scripts/catalog.py import products.csv --batch-size 1000
+    python scripts/catalog.py export backup.ndjson
+    python scripts/catalog.py generate 100000 -o synthetic.ndjson
+    python scripts/catalog.py generate 100000 | python scripts/catalog.py import - --format ndjson
+
+Exports use the same columns as GET /api/admin/products/export and can be
+imported back unchanged.
+"""
+import argparse
+import asyncio
+import io
+import sys
+from pathlib import Path
+
+import orjson
+from sqlalchemy import select
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from catalog_io import PRODUCT_EXPORT_COLUMNS, import_products, read_rows, synthetic_products  # noqa: E402
+from exports import encode_rows  # noqa: E402
+from models import Base, Product  # noqa: E402
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    sys.exit(f"Cannot tell the format of {path}; pass --format csv or --format ndjson")
+
+
+def open_output(path):
+    return sys.stdout.buffer if path == "-" else open(path, "wb")
+
+
+async def run_import(args):
+    fmt = detect_format(args.path, args.format)
+    stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="") if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+
+    def progress(report):
+        print(f"  {report.rows} rows read, {report.upserted} upserted, {report.failed} rejected ({report.rate:.0f} rows/s)", file=sys.stderr)
+
+    async with server.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    with stream:
+        report = await import_products(
+            server.engine, read_rows(stream, fmt), server.ProductCreate,
+            batch_size=args.batch_size, max_errors=args.max_errors, progress=progress,
+        )
+    for line, message in report.errors:
+        print(f"line {line}: {message}", file=sys.stderr)
+    if report.failed > len(report.errors):
+        print(f"... and {report.failed - len(report.errors)} more rejected rows", file=sys.stderr)
+    print(f"✓ Imported {report.upserted} products from {report.rows} rows in {report.elapsed:.1f}s ({report.failed} rejected)")
+    if report.upserted:
+        # Every worker drops cached products; the others also rebuild their search index
+        server.invalidation_bus.publish("catalog", "search")
+    return 1 if report.failed else 0
+
+
+async def run_export(args):
+    fmt = detect_format(args.path, args.format)
+    query = select(*(getattr(Product, column) for column in PRODUCT_EXPORT_COLUMNS)).order_by(Product.id)
+    count = 0
+
+    async def rows(result):
+        nonlocal count
+        async for row in result:
+            count += 1
+            yield dict(row._mapping)
+
+    out = open_output(args.path)
+    try:
+        async with server.async_session() as db:
+            result = await db.stream(query.execution_options(yield_per=args.batch_size))
+            async for chunk in encode_rows(rows(result), fmt, PRODUCT_EXPORT_COLUMNS, args.batch_size):
+                out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    print(f"✓ Exported {count} products", file=sys.stderr)
+    return 0
+
+
+def run_generate(args):
+    out = open_output(args.output)
+    try:
+        for row in synthetic_products(args.count, args.seed):
+            out.write(orjson.dumps(row) + b"\n")
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    print(f"✓ Generated {args.count} products", file=sys.stderr)
+    return 0
+
+
+async def main(args):
+    if args.command == "generate":
+        return run_generate(args)
+    # Start the bus so running workers hear about the import
+    await server.invalidation_bus.start()
+    try:
+        return await (run_import(args) if args.command == "import" else run_export(args))
+    finally:
+        await server.invalidation_bus.stop()
+        await server.engine.dispose()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="upsert products from a CSV or NDJSON file ('-' for stdin)")
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=["csv", "ndjson"])
+    importer.add_argument("--batch-size", type=int, default=500, help="rows per INSERT and per transaction")
+    importer.add_argument("--max-errors", type=int, default=100, help="rejected rows to print in full")
+
+    exporter = commands.add_parser("export", help="stream every product to a CSV or NDJSON file ('-' for stdout)")
+    exporter.add_argument("path")
+    exporter.add_argument("--format", choices=["csv", "ndjson"])
+    exporter.add_argument("--batch-size", type=int, default=1000, help="rows fetched and written per chunk")
+
+    generator = commands.add_parser("generate", help="write a deterministic synthetic catalog as NDJSON")
+    generator.add_argument("count", type=int)
+    generator.add_argument("-o", "--output", default="-")
+    generator.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
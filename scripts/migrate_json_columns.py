@@ -0,0 +1,246 @@
+"""Move the legacy JSON-in-VARCHAR columns to child tables and native JSON.
+
+    carts.items           -> cart_items rows
+    orders.items          -> order_items rows
+    wishlists.product_ids -> wishlist_items rows
+    products.images / products.specifications -> JSON columns (MySQL)
+    carts.version         -> added; duplicate carts per user collapsed, user_id made unique
+    users/products/orders -> created_at indexes for the paginated listings
+
+Rows are converted in keyset-ordered batches, one transaction per batch.
+Each converted blob is set to NULL in the same transaction, so the script
+can be stopped and re-run at any point. Run it once before deploying the
+code that reads the new tables: that step relaxes the legacy columns to
+NULL so the new code can insert rows. Run it again with --drop-legacy once
+every blob has been converted.
+
+    python scripts/migrate_json_columns.py --batch-size 500
+    python scripts/migrate_json_columns.py --drop-legacy
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from sqlalchemy import bindparam, inspect, insert, select, text
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from models import Base, CartLine, OrderLine, WishlistItem  # noqa: E402
+from server import engine  # noqa: E402
+
+
+def _cart_lines(cart_id, items):
+    quantities = {}
+    for item in items:
+        quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + int(item["quantity"])
+    return [
+        {"cart_id": cart_id, "product_id": product_id, "quantity": quantity, "position": position}
+        for position, (product_id, quantity) in enumerate(quantities.items())
+    ]
+
+
+def _order_lines(order_id, items):
+    return [
+        {
+            "order_id": order_id,
+            "position": position,
+            "product_id": item["product_id"],
+            "product_name": item.get("product_name", ""),
+            "price": float(item.get("price", 0.0)),
+            "quantity": int(item["quantity"]),
+        }
+        for position, item in enumerate(items)
+    ]
+
+
+def _wishlist_items(wishlist_id, product_ids):
+    return [
+        {"wishlist_id": wishlist_id, "product_id": product_id, "position": position}
+        for position, product_id in enumerate(dict.fromkeys(product_ids))
+    ]
+
+
+# (table, legacy column, child model, child foreign key, row builder)
+CHILD_MIGRATIONS = [
+    ("carts", "items", CartLine, CartLine.cart_id, _cart_lines),
+    ("orders", "items", OrderLine, OrderLine.order_id, _order_lines),
+    ("wishlists", "product_ids", WishlistItem, WishlistItem.wishlist_id, _wishlist_items),
+]
+
+
+async def table_columns(conn, table):
+    return await conn.run_sync(lambda sync_conn: {c["name"]: c for c in inspect(sync_conn).get_columns(table)})
+
+
+async def relax_legacy_column(table, column):
+    # Returns whether converted blobs can be cleared. SQLite cannot relax NOT NULL
+    # in place; there re-runs rely on the "already has lines" check alone.
+    async with engine.begin() as conn:
+        info = (await table_columns(conn, table))[column]
+        if info["nullable"]:
+            return True
+        if engine.dialect.name != "mysql":
+            return False
+        await conn.execute(text(f"ALTER TABLE {table} MODIFY {column} {info['type'].compile(engine.dialect)} NULL"))
+        print(f"  {table}.{column} is now nullable")
+        return True
+
+
+async def migrate_children(table, column, model, parent_key, build, batch_size):
+    async with engine.connect() as conn:
+        if column not in await table_columns(conn, table):
+            print(f"{table}.{column}: already migrated")
+            return
+    clearable = await relax_legacy_column(table, column)
+
+    pending = f" AND {column} IS NOT NULL" if clearable else ""
+    select_batch = text(f"SELECT id, {column} FROM {table} WHERE id > :last{pending} ORDER BY id LIMIT :limit")
+    clear_batch = text(f"UPDATE {table} SET {column} = NULL WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+    last_id, converted, skipped, failed = "", 0, 0, 0
+    while True:
+        async with engine.begin() as conn:
+            rows = (await conn.execute(select_batch, {"last": last_id, "limit": batch_size})).all()
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            # Parents the new code has already written lines for keep those lines
+            already = set((await conn.execute(select(parent_key).where(parent_key.in_(ids)).distinct())).scalars())
+            values = []
+            for parent_id, blob in rows:
+                if parent_id in already:
+                    skipped += 1
+                    continue
+                try:
+                    values.extend(build(parent_id, json.loads(blob) if blob else []))
+                    converted += 1
+                except (ValueError, KeyError, TypeError) as e:
+                    failed += 1
+                    print(f"  {table} {parent_id}: unreadable {column} ({e}); dropped")
+            if values:
+                await conn.execute(insert(model), values)
+            if clearable:
+                await conn.execute(clear_batch, {"ids": ids})
+        last_id = ids[-1]
+        print(f"{table}.{column}: {converted} converted, {skipped} skipped, {failed} unreadable")
+
+
+async def migrate_product_json(batch_size):
+    # MySQL refuses the whole ALTER if a single row holds invalid JSON, so repair first
+    defaults = {"images": [], "specifications": {}}
+    last_id, repaired = "", 0
+    while True:
+        async with engine.begin() as conn:
+            rows = (await conn.execute(
+                text("SELECT id, images, specifications FROM products WHERE id > :last ORDER BY id LIMIT :limit"),
+                {"last": last_id, "limit": batch_size},
+            )).all()
+            if not rows:
+                break
+            for product_id, *blobs in rows:
+                fixes = {}
+                for (column, default), blob in zip(defaults.items(), blobs):
+                    if isinstance(blob, (list, dict)):
+                        continue
+                    try:
+                        value = json.loads(blob) if blob else default
+                    except ValueError:
+                        # A bare image URL was the most common hand-entered mistake
+                        value = [blob] if column == "images" else default
+                    if not isinstance(value, type(default)):
+                        value = default
+                    if blob != json.dumps(value):
+                        fixes[column] = json.dumps(value)
+                if fixes:
+                    repaired += 1
+                    assignments = ", ".join(f"{column} = :{column}" for column in fixes)
+                    await conn.execute(text(f"UPDATE products SET {assignments} WHERE id = :id"), {**fixes, "id": product_id})
+        last_id = rows[-1][0]
+    print(f"products: {repaired} rows normalised to canonical JSON")
+
+    if engine.dialect.name == "mysql":
+        async with engine.begin() as conn:
+            columns = await table_columns(conn, "products")
+            if columns["images"]["type"].__class__.__name__ != "JSON":
+                await conn.execute(text("ALTER TABLE products MODIFY images JSON NOT NULL, MODIFY specifications JSON NOT NULL"))
+                print("products: images/specifications converted to JSON columns")
+
+
+async def migrate_cart_versions():
+    async with engine.connect() as conn:
+        columns = await table_columns(conn, "carts")
+        indexes = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_indexes("carts"))
+    if "version" not in columns:
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE carts ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+        print("carts.version: added")
+    if any(index["column_names"] == ["user_id"] and index["unique"] for index in indexes):
+        print("carts.user_id: already unique")
+        return
+    async with engine.begin() as conn:
+        # Racing first writes could create several carts for one user; keep the newest
+        duplicates = (await conn.execute(text(
+            "SELECT id FROM carts c WHERE EXISTS (SELECT 1 FROM carts newer WHERE newer.user_id = c.user_id"
+            " AND (newer.updated_at > c.updated_at OR (newer.updated_at = c.updated_at AND newer.id > c.id)))"
+        ))).scalars().all()
+        if duplicates:
+            remove = bindparam("ids", expanding=True)
+            await conn.execute(text("DELETE FROM cart_items WHERE cart_id IN :ids").bindparams(remove), {"ids": duplicates})
+            await conn.execute(text("DELETE FROM carts WHERE id IN :ids").bindparams(remove), {"ids": duplicates})
+        for index in indexes:
+            if index["column_names"] == ["user_id"]:
+                drop = f"DROP INDEX {index['name']} ON carts" if engine.dialect.name == "mysql" else f"DROP INDEX {index['name']}"
+                await conn.execute(text(drop))
+        await conn.execute(text("CREATE UNIQUE INDEX ix_carts_user_id ON carts (user_id)"))
+    print(f"carts.user_id: unique ({len(duplicates)} duplicate carts removed)")
+
+
+async def add_listing_indexes():
+    # Keyset-paginated listings order by created_at; create_all only adds these to new tables
+    for table in ("users", "products", "orders"):
+        async with engine.begin() as conn:
+            existing = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_indexes(table))
+            if any(index["column_names"][:1] == ["created_at"] for index in existing):
+                continue
+            for index in Base.metadata.tables[table].indexes:
+                if [column.name for column in index.columns] == ["created_at"]:
+                    await conn.run_sync(index.create)
+                    print(f"{table}.created_at: index {index.name} created")
+
+
+async def drop_legacy():
+    for table, column, *_ in CHILD_MIGRATIONS:
+        async with engine.begin() as conn:
+            info = (await table_columns(conn, table)).get(column)
+            if info is None:
+                continue
+            remaining = info["nullable"] and await conn.scalar(text(f"SELECT COUNT(*) FROM {table} WHERE {column} IS NOT NULL"))
+            if remaining:
+                print(f"{table}.{column}: {remaining} rows not migrated yet; keeping column")
+                continue
+            await conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+            print(f"{table}.{column}: dropped")
+
+
+async def main(batch_size, drop):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        for migration in CHILD_MIGRATIONS:
+            await migrate_children(*migration, batch_size)
+        await migrate_product_json(batch_size)
+        await migrate_cart_versions()
+        await add_listing_indexes()
+        if drop:
+            await drop_legacy()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--drop-legacy", action="store_true", help="drop the old JSON columns once fully migrated")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.drop_legacy))
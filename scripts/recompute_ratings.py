@@ -0,0 +1,23 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+
+async def main():
+    # Start the bus so running workers drop their cached products once we're done
+    await server.invalidation_bus.start()
+    try:
+        async with server.async_session() as db:
+            updated = await server.recompute_ratings(db)
+        print(f"✓ Recomputed ratings for {updated} products")
+    finally:
+        await server.invalidation_bus.stop()
+        await server.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,224 +1,217 @@
+"""Seed a fresh database with the admin account and the sample catalog.
+
+Safe to re-run: the admin is only created when missing, and the sample
+products have fixed ids, so they are upserted rather than duplicated.
+For large synthetic catalogs use ``scripts/catalog.py generate``.
+
+    python scripts/seed_data.py
+"""
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-from datetime import datetime, timezone
+import sys
 import uuid
+from pathlib import Path
 
-# MongoDB connection
-MONGO_URL = "mongodb://localhost:27017"
-DB_NAME = "bosch_ecommerce"
+from sqlalchemy import select
 
-async def seed_database():
-    client = AsyncIOMotorClient(MONGO_URL)
-    db = client[DB_NAME]
-    
-    # Create admin user
-    admin_user = {
-        "id": str(uuid.uuid4()),
-        "email": "admin@bosch.com",
-        "password": "$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewY5lXVfqWB9/wOG",  # password: admin123
-        "name": "Admin User",
-        "phone": "+91 9876543210",
-        "role": "admin",
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    existing_admin = await db.users.find_one({"email": "admin@bosch.com"})
-    if not existing_admin:
-        await db.users.insert_one(admin_user)
-        print("✓ Admin user created (admin@bosch.com / admin123)")
-    
-    # Sample products
-    products = [
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Bosch Serie 8 Built-in Oven",
-            "description": "Experience ultimate cooking precision with PerfectBake sensor, EcoClean Direct cleaning, and 13 heating modes. The perfect companion for your modern kitchen.",
-            "price": 89999,
-            "category": "ovens",
-            "images": [
-                "https://images.unsplash.com/photo-1723259461381-59ab9fa18f5d?w=800&q=80",
-                "https://images.unsplash.com/photo-1723259461381-59ab9fa18f5d?w=800&q=80"
-            ],
-            "stock": 15,
-            "specifications": {
-                "Capacity": "71 Litres",
-                "Power": "3600W",
-                "Heating Modes": "13",
-                "Color": "Stainless Steel",
-                "Warranty": "2 Years"
-            },
-            "ratings_avg": 4.5,
-            "ratings_count": 28,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Bosch PUE611BF1J 4 Burner Induction Cooktop",
-            "description": "High-efficiency induction cooking with CombiZone feature, PowerBoost function, and touch control panel. Cook faster while saving energy.",
-            "price": 49999,
-            "category": "cooktops",
-            "images": [
-                "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80",
-                "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80"
-            ],
-            "stock": 22,
-            "specifications": {
-                "Burners": "4",
-                "Power": "7400W",
-                "Control": "Touch",
-                "Safety": "Auto Shut-off",
-                "Warranty": "2 Years"
-            },
-            "ratings_avg": 4.7,
-            "ratings_count": 45,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Bosch Serie 6 14 Place Settings Dishwasher",
-            "description": "Whisper-quiet dishwashing with Zeolith drying technology, VarioSpeed Plus for 3x faster cleaning, and AquaStop leak protection system.",
-            "price": 69999,
-            "category": "dishwashers",
-            "images": [
-                "https://images.unsplash.com/photo-1676907228185-6869277a9f8f?w=800&q=80",
-                "https://images.unsplash.com/photo-1676907228185-6869277a9f8f?w=800&q=80"
-            ],
-            "stock": 18,
-            "specifications": {
-                "Place Settings": "14",
-                "Programs": "6",
-                "Noise Level": "44 dB",
-                "Energy Rating": "5 Star",
-                "Warranty": "2 Years"
-            },
-            "ratings_avg": 4.6,
-            "ratings_count": 32,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Bosch DWB96DM50I 90cm Wall Mounted Chimney",
-            "description": "Powerful 900 m³/hr suction with German engineering, baffle filters for efficient oil absorption, and LED lighting for perfect illumination.",
-            "price": 38999,
-            "category": "chimneys",
-            "images": [
-                "https://images.unsplash.com/photo-1760067537565-1d4cbb8da0c3?w=800&q=80",
-                "https://images.unsplash.com/photo-1760067537565-1d4cbb8da0c3?w=800&q=80"
-            ],
-            "stock": 25,
-            "specifications": {
-                "Suction": "900 m³/hr",
-                "Size": "90 cm",
-                "Filter Type": "Baffle",
-                "Noise Level": "58 dB",
-                "Warranty": "2 Years"
-            },
-            "ratings_avg": 4.4,
-            "ratings_count": 19,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Bosch Serie 4 Compact Built-in Microwave",
-            "description": "Space-saving design with 21L capacity, AutoPilot programs, and QuickStart function. Perfect for reheating and defrosting.",
-            "price": 34999,
-            "category": "ovens",
-            "images": [
-                "https://images.unsplash.com/photo-1765766601532-90e9b96320c8?w=800&q=80",
-                "https://images.unsplash.com/photo-1765766601532-90e9b96320c8?w=800&q=80"
-            ],
-            "stock": 30,
-            "specifications": {
-                "Capacity": "21 Litres",
-                "Power": "900W",
-                "Programs": "5 AutoPilot",
-                "Control": "Touch",
-                "Warranty": "2 Years"
-            },
-            "ratings_avg": 4.3,
-            "ratings_count": 15,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Bosch FlexInduction Gas Hob 4 Burners",
-            "description": "Premium glass-on-steel design with brass burners, auto ignition, and flame failure safety device. Elegant and efficient.",
-            "price": 29999,
-            "category": "hobs",
-            "images": [
-                "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80",
-                "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80"
-            ],
-            "stock": 28,
-            "specifications": {
-                "Burners": "4 Brass",
-                "Material": "Glass on Steel",
-                "Ignition": "Auto",
-                "Safety": "Flame Failure",
-                "Warranty": "2 Years"
-            },
-            "ratings_avg": 4.5,
-            "ratings_count": 22,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Bosch Serie 8 Pyrolytic Self-Cleaning Oven",
-            "description": "Premium built-in oven with pyrolytic self-cleaning, 4D HotAir for perfect results on multiple levels, and meat probe for precise cooking.",
-            "price": 125999,
-            "category": "ovens",
-            "images": [
-                "https://images.unsplash.com/photo-1723259461381-59ab9fa18f5d?w=800&q=80",
-                "https://images.unsplash.com/photo-1723259461381-59ab9fa18f5d?w=800&q=80"
-            ],
-            "stock": 10,
-            "specifications": {
-                "Capacity": "71 Litres",
-                "Cleaning": "Pyrolytic",
-                "Heating Modes": "13",
-                "Features": "4D HotAir, Meat Probe",
-                "Warranty": "2 Years"
-            },
-            "ratings_avg": 4.8,
-            "ratings_count": 35,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Bosch Full Touch Control Induction Hob",
-            "description": "Revolutionary full-surface induction cooking with DirectSelect interface, PowerBoost for all zones, and ReStart function.",
-            "price": 79999,
-            "category": "cooktops",
-            "images": [
-                "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80",
-                "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80"
-            ],
-            "stock": 12,
-            "specifications": {
-                "Type": "Full Surface",
-                "Zones": "Flexible",
-                "Control": "DirectSelect",
-                "Features": "PowerBoost, ReStart",
-                "Warranty": "2 Years"
-            },
-            "ratings_avg": 4.9,
-            "ratings_count": 41,
-            "created_at": datetime.now(timezone.utc).isoformat()
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from catalog_io import import_products  # noqa: E402
+from models import Base, User  # noqa: E402
+
+ADMIN_EMAIL = "admin@bosch.com"
+ADMIN_PASSWORD = "admin123"
+# Stable ids derived from the product name keep re-runs idempotent
+SAMPLE_NAMESPACE = uuid.UUID("5f0c2b8e-3d1a-4c55-9a7e-0b6f4d2e8c11")
+
+SAMPLE_PRODUCTS = [
+    {
+        "name": "Bosch Serie 8 Built-in Oven",
+        "description": "Experience ultimate cooking precision with PerfectBake sensor, EcoClean Direct cleaning, and 13 heating modes. The perfect companion for your modern kitchen.",
+        "price": 89999,
+        "category": "ovens",
+        "images": [
+            "https://images.unsplash.com/photo-1723259461381-59ab9fa18f5d?w=800&q=80",
+            "https://images.unsplash.com/photo-1723259461381-59ab9fa18f5d?w=800&q=80"
+        ],
+        "stock": 15,
+        "specifications": {
+            "Capacity": "71 Litres",
+            "Power": "3600W",
+            "Heating Modes": "13",
+            "Color": "Stainless Steel",
+            "Warranty": "2 Years"
+        }
+    },
+    {
+        "name": "Bosch PUE611BF1J 4 Burner Induction Cooktop",
+        "description": "High-efficiency induction cooking with CombiZone feature, PowerBoost function, and touch control panel. Cook faster while saving energy.",
+        "price": 49999,
+        "category": "cooktops",
+        "images": [
+            "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80",
+            "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80"
+        ],
+        "stock": 22,
+        "specifications": {
+            "Burners": "4",
+            "Power": "7400W",
+            "Control": "Touch",
+            "Safety": "Auto Shut-off",
+            "Warranty": "2 Years"
+        }
+    },
+    {
+        "name": "Bosch Serie 6 14 Place Settings Dishwasher",
+        "description": "Whisper-quiet dishwashing with Zeolith drying technology, VarioSpeed Plus for 3x faster cleaning, and AquaStop leak protection system.",
+        "price": 69999,
+        "category": "dishwashers",
+        "images": [
+            "https://images.unsplash.com/photo-1676907228185-6869277a9f8f?w=800&q=80",
+            "https://images.unsplash.com/photo-1676907228185-6869277a9f8f?w=800&q=80"
+        ],
+        "stock": 18,
+        "specifications": {
+            "Place Settings": "14",
+            "Programs": "6",
+            "Noise Level": "44 dB",
+            "Energy Rating": "5 Star",
+            "Warranty": "2 Years"
+        }
+    },
+    {
+        "name": "Bosch DWB96DM50I 90cm Wall Mounted Chimney",
+        "description": "Powerful 900 m³/hr suction with German engineering, baffle filters for efficient oil absorption, and LED lighting for perfect illumination.",
+        "price": 38999,
+        "category": "chimneys",
+        "images": [
+            "https://images.unsplash.com/photo-1760067537565-1d4cbb8da0c3?w=800&q=80",
+            "https://images.unsplash.com/photo-1760067537565-1d4cbb8da0c3?w=800&q=80"
+        ],
+        "stock": 25,
+        "specifications": {
+            "Suction": "900 m³/hr",
+            "Size": "90 cm",
+            "Filter Type": "Baffle",
+            "Noise Level": "58 dB",
+            "Warranty": "2 Years"
+        }
+    },
+    {
+        "name": "Bosch Serie 4 Compact Built-in Microwave",
+        "description": "Space-saving design with 21L capacity, AutoPilot programs, and QuickStart function. Perfect for reheating and defrosting.",
+        "price": 34999,
+        "category": "ovens",
+        "images": [
+            "https://images.unsplash.com/photo-1765766601532-90e9b96320c8?w=800&q=80",
+            "https://images.unsplash.com/photo-1765766601532-90e9b96320c8?w=800&q=80"
+        ],
+        "stock": 30,
+        "specifications": {
+            "Capacity": "21 Litres",
+            "Power": "900W",
+            "Programs": "5 AutoPilot",
+            "Control": "Touch",
+            "Warranty": "2 Years"
+        }
+    },
+    {
+        "name": "Bosch FlexInduction Gas Hob 4 Burners",
+        "description": "Premium glass-on-steel design with brass burners, auto ignition, and flame failure safety device. Elegant and efficient.",
+        "price": 29999,
+        "category": "hobs",
+        "images": [
+            "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80",
+            "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80"
+        ],
+        "stock": 28,
+        "specifications": {
+            "Burners": "4 Brass",
+            "Material": "Glass on Steel",
+            "Ignition": "Auto",
+            "Safety": "Flame Failure",
+            "Warranty": "2 Years"
+        }
+    },
+    {
+        "name": "Bosch Serie 8 Pyrolytic Self-Cleaning Oven",
+        "description": "Premium built-in oven with pyrolytic self-cleaning, 4D HotAir for perfect results on multiple levels, and meat probe for precise cooking.",
+        "price": 125999,
+        "category": "ovens",
+        "images": [
+            "https://images.unsplash.com/photo-1723259461381-59ab9fa18f5d?w=800&q=80",
+            "https://images.unsplash.com/photo-1723259461381-59ab9fa18f5d?w=800&q=80"
+        ],
+        "stock": 10,
+        "specifications": {
+            "Capacity": "71 Litres",
+            "Cleaning": "Pyrolytic",
+            "Heating Modes": "13",
+            "Features": "4D HotAir, Meat Probe",
+            "Warranty": "2 Years"
         }
-    ]
-    
-    # Clear existing products
-    await db.products.delete_many({})
-    
-    # Insert products
-    await db.products.insert_many(products)
-    print(f"✓ {len(products)} products added")
-    
+    },
+    {
+        "name": "Bosch Full Touch Control Induction Hob",
+        "description": "Revolutionary full-surface induction cooking with DirectSelect interface, PowerBoost for all zones, and ReStart function.",
+        "price": 79999,
+        "category": "cooktops",
+        "images": [
+            "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80",
+            "https://images.unsplash.com/photo-1762810931790-40b25e10b3e7?w=800&q=80"
+        ],
+        "stock": 12,
+        "specifications": {
+            "Type": "Full Surface",
+            "Zones": "Flexible",
+            "Control": "DirectSelect",
+            "Features": "PowerBoost, ReStart",
+            "Warranty": "2 Years"
+        }
+    }
+]
+
+
+async def seed_database():
+    async with server.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with server.async_session() as db:
+        existing_admin = (await db.execute(select(User.id).where(User.email == ADMIN_EMAIL))).scalar_one_or_none()
+        if existing_admin is None:
+            db.add(User(
+                id=str(uuid.uuid4()),
+                email=ADMIN_EMAIL,
+                password=server.hash_password(ADMIN_PASSWORD),
+                name="Admin User",
+                phone="+91 9876543210",
+                role="admin",
+            ))
+            await db.commit()
+            print(f"✓ Admin user created ({ADMIN_EMAIL} / {ADMIN_PASSWORD})")
+
+    rows = (
+        (line, {"id": str(uuid.uuid5(SAMPLE_NAMESPACE, product["name"])), **product})
+        for line, product in enumerate(SAMPLE_PRODUCTS, 1)
+    )
+    report = await import_products(server.engine, rows, server.ProductCreate)
+    print(f"✓ {report.upserted} products added")
+
+    # Running workers drop cached products and rebuild their search index
+    server.invalidation_bus.publish("catalog", "search")
+
     print("\n=== Database Seeded Successfully ===")
-    print("Admin Login: admin@bosch.com / admin123")
-    
-    client.close()
+    print(f"Admin Login: {ADMIN_EMAIL} / {ADMIN_PASSWORD}")
+
+
+async def main():
+    await server.invalidation_bus.start()
+    try:
+        await seed_database()
+    finally:
+        await server.invalidation_bus.stop()
+        await server.engine.dispose()
+
 
 if __name__ == "__main__":
-    asyncio.run(seed_database())
+    asyncio.run(main())
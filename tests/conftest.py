@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# The backend imports its siblings as top-level modules and reads its settings at import time
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+os.environ.setdefault("RENDER", "1")  # skip backend/.env
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.sqlite')}")
+os.environ["DATABASE_REPLICA_URL"] = ""
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("JWT_EXPIRATION_HOURS", "1")
+os.environ.setdefault("RAZORPAY_KEY_ID", "test")
+os.environ.setdefault("RAZORPAY_KEY_SECRET", "test")
+os.environ.setdefault("PAYMENT_GATEWAY", "fake")
+os.environ.setdefault("INVALIDATION_BACKEND", "memory")
@@ -0,0 +1,198 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+
+from search import SearchIndex, tokenize
+
+
+def fields(name, description="", category="tools", specifications=""):
+    return {"name": name, "category": category, "description": description, "specifications": specifications}
+
+
+def ids(results):
+    return [doc_id for doc_id, _ in results]
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add("drill", fields("Bosch GSB Impact Drill", "Compact drill for masonry"))
+    index.add("driver", fields("Bosch GSR Cordless Driver", "Drives screws, light drilling"))
+    index.add("oven", fields("Serie 8 Built-in Oven", "Pyrolytic oven", category="ovens"))
+    index.add("hood", fields("Chimney Hood", "Quiet extraction above the oven", category="hoods"))
+    return index
+
+
+def test_tokenize_lowercases_and_splits_on_punctuation():
+    assert tokenize("Bosch GSB-13, 650W") == ["bosch", "gsb", "13", "650w"]
+
+
+def test_every_token_must_match(index):
+    assert ids(index.search("bosch impact")) == ["drill"]
+    assert ids(index.search("bosch oven")) == []
+    assert ids(index.search("drill bosch")) == ["drill"]
+
+
+def test_last_token_matches_by_prefix(index):
+    assert set(ids(index.search("dri"))) == {"drill", "driver"}
+    assert ids(index.search("bosch cordl")) == ["driver"]
+
+
+def test_only_the_last_token_is_a_prefix(index):
+    assert index.search("cordl bosch") == []
+    assert index.search("dri", prefix=False) == []
+
+
+def test_name_hits_rank_above_description_hits(index):
+    assert ids(index.search("oven")) == ["oven", "hood"]
+
+
+def test_exact_match_ranks_above_prefix_match():
+    index = SearchIndex()
+    index.add("exact", fields("Drill"))
+    index.add("longer", fields("Drilling"))
+    assert ids(index.search("drill")) == ["exact", "longer"]
+
+
+def test_ties_break_by_id_and_limit_keeps_the_best():
+    index = SearchIndex()
+    for doc_id in ["d", "b", "c", "a"]:
+        index.add(doc_id, fields("Washer"))
+    index.add("best", fields("Washer washer"))
+    assert ids(index.search("washer")) == ["best", "a", "b", "c", "d"]
+    assert ids(index.search("washer", limit=3)) == ["best", "a", "b"]
+
+
+def test_remove_drops_the_document_and_its_terms(index):
+    index.remove("oven")
+    assert "oven" not in index
+    assert ids(index.search("oven")) == ["hood"]
+    assert index.search("pyrolytic") == []
+    assert index.expand_prefix("pyro") == []
+    index.remove("oven")  # removing twice is a no-op
+    assert len(index) == 3
+
+
+def test_add_replaces_an_existing_document(index):
+    index.add("drill", fields("Bosch Angle Grinder"))
+    assert len(index) == 4
+    assert index.search("impact") == []
+    assert ids(index.search("grinder")) == ["drill"]
+
+
+def test_removed_rows_are_reused(index):
+    index.remove("drill")
+    index.add("grinder", fields("Bosch Angle Grinder"))
+    assert len(index._ids) == 4
+    assert set(ids(index.search("bosch"))) == {"driver", "grinder"}
+    assert index.search("impact") == []
+
+
+def test_build_matches_incremental_adds(index):
+    documents = [
+        ("drill", fields("Bosch GSB Impact Drill", "Compact drill for masonry")),
+        ("driver", fields("Bosch GSR Cordless Driver", "Drives screws, light drilling")),
+        ("oven", fields("Serie 8 Built-in Oven", "Pyrolytic oven", category="ovens")),
+        ("hood", fields("Chimney Hood", "Quiet extraction above the oven", category="hoods")),
+    ]
+    built = SearchIndex.build(documents)
+    for query in ["bosch", "dri", "oven", "bosch drill", "b"]:
+        assert built.search(query) == pytest.approx(index.search(query))
+
+
+def test_swap_replaces_contents_in_place(index):
+    live = index
+    live.swap(SearchIndex.build([("kettle", fields("Electric Kettle"))]))
+    assert len(live) == 1
+    assert ids(live.search("kettle")) == ["kettle"]
+
+
+# ---- GET /api/products?search= against SQLite ----
+
+PRODUCTS = {
+    "drill": ("Bosch GSB Impact Drill", "power-tools", 4999.0),
+    "driver": ("Bosch GSR Cordless Driver", "power-tools", 6999.0),
+    "oven": ("Serie 8 Built-in Oven", "ovens", 89999.0),
+    "hood": ("Chimney Hood", "hoods", 24999.0),
+}
+
+
+@pytest.fixture(scope="module")
+def api():
+    import server
+    from models import Base, Product
+
+    product_ids = {key: str(uuid.uuid4()) for key in PRODUCTS}
+
+    async def seed():
+        async with server.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        async with server.async_session() as db:
+            db.add_all(
+                Product(
+                    id=product_ids[key], name=name, category=category, price=price, stock=5, images=[],
+                    description="Quiet extraction above the oven" if key == "hood" else "",
+                    specifications={},
+                )
+                for key, (name, category, price) in PRODUCTS.items()
+            )
+            await db.commit()
+        await server.rebuild_search_index()
+        await server.rebuild_facet_index()
+        await server.engine.dispose()
+
+    asyncio.run(seed())
+
+    def get(path, **params):
+        async def call():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.get(path, params=params)
+            await server.engine.dispose()
+            return response
+
+        return asyncio.run(call())
+
+    return get, {product_id: key for key, product_id in product_ids.items()}
+
+
+def names(api, **params):
+    get, keys = api
+    response = get("/api/products", **params)
+    assert response.status_code == 200
+    body = response.json()
+    items = body["items"] if isinstance(body, dict) else body
+    return [keys[item["id"]] for item in items]
+
+
+def test_listing_search_ranks_by_relevance(api):
+    assert names(api, search="oven") == ["oven", "hood"]
+
+
+def test_listing_search_is_case_insensitive_and_prefix_matches(api):
+    assert set(names(api, search="DRI")) == {"drill", "driver"}
+
+
+def test_listing_search_requires_every_word(api):
+    assert names(api, search="bosch impact") == ["drill"]
+    assert names(api, search="bosch oven") == []
+
+
+def test_listing_search_combines_with_filters(api):
+    assert names(api, search="bosch", category="power-tools", max_price=5000) == ["drill"]
+
+
+def test_listing_search_pages_in_rank_order(api):
+    get, _ = api
+    first = get("/api/products", search="oven", limit=1).json()
+    assert names(api, search="oven", limit=1) == ["oven"]
+    assert names(api, search="oven", limit=1, cursor=first["next_cursor"]) == ["hood"]
+
+
+def test_listing_search_without_matches_is_empty(api):
+    assert names(api, search="dishwasher") == []
+    get, _ = api
+    assert get("/api/products", search="dishwasher", limit=5).json()["items"] == []